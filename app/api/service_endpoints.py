@@ -1,16 +1,24 @@
 from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
+from fastapi.responses import Response
 from sqlalchemy.orm import Session
 from typing import List, Dict, Optional
 from datetime import datetime
 from pydantic import BaseModel, Field
+import orjson
 
 from app.models.database import get_db
-from app.services.service_integration import ServiceIntegrationFactory
+from app.services.service_integration import (
+    ServiceIntegrationFactory, TransportServiceIntegration, HospitalityServiceIntegration
+)
 from app.services.visa_card_service import VisaCardService
 
 router = APIRouter(prefix="/api/v1/services", tags=["services"])
 visa_service = VisaCardService()
 
+# Static listings are serialized once at import instead of on every request
+_ROUTES_RESPONSE = orjson.dumps({"status": "success", "data": TransportServiceIntegration.ROUTES})
+_HOTELS_RESPONSE = orjson.dumps({"status": "success", "data": HospitalityServiceIntegration.HOTELS})
+
 # Pydantic Models for Service Requests
 
 class UtilityInquiryRequest(BaseModel):
@@ -256,12 +264,7 @@ async def pay_education_fees(
 @router.get("/transport/routes")
 async def get_transport_routes(db: Session = Depends(get_db)):
     """Get available transport routes"""
-    try:
-        integration = ServiceIntegrationFactory.get_integration('transport')
-        routes = await integration.get_available_routes()
-        return {"status": "success", "data": routes}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail="Service temporarily unavailable")
+    return Response(content=_ROUTES_RESPONSE, media_type="application/json")
 
 @router.post("/transport/voucher")
 async def purchase_transport_voucher(
@@ -308,18 +311,9 @@ async def search_hotels(
     db: Session = Depends(get_db)
 ):
     """Search available hotels"""
-    try:
-        integration = ServiceIntegrationFactory.get_integration('hospitality')
-        search_criteria = {
-            'check_in_date': check_in,
-            'check_out_date': check_out,
-            'location': location,
-            'guests': guests
-        }
-        hotels = await integration.search_hotels(search_criteria)
-        return {"status": "success", "data": hotels}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail="Hotel search temporarily unavailable")
+    # The listing does not depend on the search criteria yet; once filters are
+    # applied, route filtered searches through integration.search_hotels instead
+    return Response(content=_HOTELS_RESPONSE, media_type="application/json")
 
 @router.post("/hospitality/hotel/booking")
 async def make_hotel_booking(
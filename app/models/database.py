@@ -1,12 +1,34 @@
-from sqlalchemy import create_engine, Column, String, Float, DateTime, Enum, Text, Boolean
-from sqlalchemy.orm import declarative_base, sessionmaker, Session
+from sqlalchemy import create_engine, event, Column, String, Float, DateTime, Enum, Text, Boolean, ForeignKey, Index, JSON, Uuid, text
+from sqlalchemy.orm import declarative_base, sessionmaker, relationship, Session
 from datetime import datetime
 import uuid
 import enum
 import secrets
+from config import config
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./payments.db"
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+def enable_sqlite_wal(sqlite_engine):
+    """Put every connection of a SQLite engine in WAL mode, so readers don't block on writers"""
+    @event.listens_for(sqlite_engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        # Safe with WAL: commits skip the fsync, which happens at checkpoints instead
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.close()
+
+SQLALCHEMY_DATABASE_URL = config.DATABASE_URL
+if SQLALCHEMY_DATABASE_URL.startswith("sqlite"):
+    engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+    enable_sqlite_wal(engine)
+else:
+    # Shared pool for request handlers and pipeline workers; pre-ping drops connections the server closed
+    engine = create_engine(
+        SQLALCHEMY_DATABASE_URL,
+        pool_size=config.DB_POOL_SIZE,
+        max_overflow=config.DB_MAX_OVERFLOW,
+        pool_pre_ping=True
+    )
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
@@ -38,29 +60,35 @@ class BusinessType(str, enum.Enum):
 class Payment(Base):
     __tablename__ = "payments"
 
-    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    # Native UUID on Postgres, compact 32-char hex on SQLite; still read/written as str
+    id = Column(Uuid(as_uuid=False), primary_key=True, default=lambda: str(uuid.uuid4()))
     merchant_id = Column(String, nullable=False)
     customer_id = Column(String, nullable=False)
     amount = Column(Float, nullable=False)
     currency = Column(String(3), default="SZL")
-    status = Column(Enum(PaymentStatus), default=PaymentStatus.PENDING)
-    risk_score = Column(Float)
-    settlement_rail = Column(Enum(SettlementRail))
-    settlement_response = Column(Text)
+    status = Column(Enum(PaymentStatus), default=PaymentStatus.PENDING, index=True)
+    risk_score = Column(Float, index=True)
+    settlement_rail = Column(Enum(SettlementRail), index=True)
+    settlement_response = Column(JSON)
     error_message = Column(String)
     created_at = Column(DateTime, default=datetime.utcnow)
     completed_at = Column(DateTime)
 
+    transactions = relationship("Transaction", order_by="Transaction.timestamp")
+
 class Transaction(Base):
     __tablename__ = "transactions"
 
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    payment_id = Column(String, nullable=False)
+    payment_id = Column(Uuid(as_uuid=False), ForeignKey("payments.id"), nullable=False)
     step = Column(String, nullable=False)
     status = Column(String, nullable=False)
-    details = Column(Text)
+    details = Column(JSON)
     timestamp = Column(DateTime, default=datetime.utcnow)
 
+    # Serves the per-payment log lookup already sorted by timestamp
+    __table_args__ = (Index("ix_tx_payment_ts", "payment_id", "timestamp"),)
+
 class Merchant(Base):
     __tablename__ = "merchants"
 
@@ -98,14 +126,25 @@ class QRCode(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
 
 def get_db():
-    db = SessionLocal()
-    try:
+    with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 def init_db():
     Base.metadata.create_all(bind=engine)
+
+    # create_all skips tables that already exist, so add indexes defined since
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+    # Payment ids written before the Uuid column type were stored dashed. Strip them once and
+    # record it in SQLite's user_version, so later startups skip the full-table scans
+    if engine.dialect.name == "sqlite":
+        with engine.begin() as conn:
+            if conn.exec_driver_sql("PRAGMA user_version").scalar() < 1:
+                conn.execute(text("UPDATE payments SET id = replace(id, '-', '') WHERE id LIKE '%-%'"))
+                conn.execute(text("UPDATE transactions SET payment_id = replace(payment_id, '-', '') WHERE payment_id LIKE '%-%'"))
+                conn.exec_driver_sql("PRAGMA user_version = 1")
     
     # Also create auth tables
     from app.models.auth_models import Base as AuthBase
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 try:
     from pydantic import EmailStr
 except ImportError:
@@ -57,6 +57,19 @@ class QRCodeResponse(BaseModel):
     expires_at: Optional[datetime]
     is_dynamic: bool
 
+class QRCodeListItem(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    qr_code_id: str
+    amount: Optional[float]
+    description: Optional[str]
+    is_dynamic: bool
+    expires_at: Optional[datetime]
+    usage_count: float
+    max_usage: Optional[float]
+    is_active: bool
+    created_at: datetime
+
 class PaymentInitiation(BaseModel):
     qr_code_id: Optional[str] = Field(None, example="QR_123456")
     merchant_id: str = Field(..., example="MERCH_001")
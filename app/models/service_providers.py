@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Enum, Boolean, DECIMAL, Text, DateTime, JSON, ForeignKey, Integer
+from sqlalchemy import Column, String, Enum, Boolean, DECIMAL, Text, DateTime, JSON, ForeignKey, Integer, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -255,6 +255,7 @@ class VisaCard(Base):
     
     # Card Details
     card_number_encrypted = Column(Text, nullable=False)
+    card_number_masked = Column(String(19))  # Display form, avoids decrypting on reads
     card_type = Column(String(20), default="prepaid")  # prepaid, debit, credit
     card_variant = Column(String(20), default="physical")  # physical, virtual, youth, corporate
     
@@ -288,6 +289,10 @@ class VisaCard(Base):
 
 class CardTransaction(Base):
     __tablename__ = "card_transactions"
+    __table_args__ = (
+        # Card history and daily/monthly spend are read newest-first per card
+        Index("ix_cardtxn_card_date", "card_id", "transaction_date"),
+    )
     
     transaction_id = Column(String(50), primary_key=True)
     card_id = Column(String(50), ForeignKey("visa_cards.card_id"), nullable=False)
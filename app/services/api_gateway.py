@@ -1,16 +1,45 @@
-from datetime import datetime, timedelta
-from typing import Dict, List
+import threading
+import time
 from sqlalchemy.orm import Session
 from app.services.merchant_service import MerchantService
+from app.services.rate_limiter import TokenBucketLimiter
+from app.services.lru_dict import LRUDict
+from config import config
+
+# Merchants are read-mostly; a status change takes at most this long to apply
+MERCHANT_AUTH_CACHE_TTL_SECONDS = 60
 
 class APIGateway:
     """Handles authentication, rate limiting, and request validation"""
 
-    def __init__(self):
-        self.rate_limits: Dict[str, List[datetime]] = {}
+    def __init__(self, rate_limit_per_minute: int = config.RATE_LIMIT_PER_MINUTE):
+        self.rate_limiter = TokenBucketLimiter(rate_limit_per_minute, period=60.0)
         self.merchant_service = MerchantService()
+        # merchant_id -> (monotonic expiry, authenticated); authentication runs in the
+        # threadpool and LRUDict reorders on every access, so all use holds the lock
+        self.auth_cache = LRUDict(10_000)
+        self._auth_cache_lock = threading.Lock()
 
     def authenticate_request(self, merchant_id: str, db: Session = None) -> bool:
+        """Authenticate a merchant, reusing the database decision for up to a minute"""
+        now = time.monotonic()
+        with self._auth_cache_lock:
+            cached = self.auth_cache.get(merchant_id)
+        if cached and cached[0] > now:
+            return cached[1]
+
+        authenticated = self._authenticate(merchant_id, db)
+        if db:
+            with self._auth_cache_lock:
+                self.auth_cache[merchant_id] = (now + MERCHANT_AUTH_CACHE_TTL_SECONDS, authenticated)
+        return authenticated
+
+    def invalidate_merchant(self, merchant_id: str):
+        """Drop a cached authentication decision after the merchant changes"""
+        with self._auth_cache_lock:
+            self.auth_cache.pop(merchant_id, None)
+
+    def _authenticate(self, merchant_id: str, db: Session = None) -> bool:
         """Enhanced authentication - checks database for registered merchants"""
         
         # If database session provided, try proper authentication
@@ -26,19 +55,5 @@ class APIGateway:
         return merchant_id.startswith("MERCH_")
 
     def check_rate_limit(self, merchant_id: str) -> bool:
-        """Simple rate limiting - max 10 requests per minute"""
-        now = datetime.utcnow()
-        if merchant_id not in self.rate_limits:
-            self.rate_limits[merchant_id] = []
-
-        # Remove old entries
-        self.rate_limits[merchant_id] = [
-            ts for ts in self.rate_limits[merchant_id]
-            if now - ts < timedelta(minutes=1)
-        ]
-
-        if len(self.rate_limits[merchant_id]) >= 10:
-            return False
-
-        self.rate_limits[merchant_id].append(now)
-        return True
\ No newline at end of file
+        """Token bucket rate limiting - RATE_LIMIT_PER_MINUTE requests per minute"""
+        return self.rate_limiter.allow(merchant_id)
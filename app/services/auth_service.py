@@ -7,7 +7,7 @@ from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_
 import bcrypt
 import re
-import json
+import orjson
 
 from app.models.auth_models import User, UserSession, LoginAttempt, UserActivity
 from app.models.auth_models import UserRole, UserStatus, VerificationStatus
@@ -389,7 +389,7 @@ class AuthenticationService:
             user_id=user_id,
             activity_type=activity_type,
             description=description,
-            activity_metadata=json.dumps(metadata) if metadata else None
+            activity_metadata=orjson.dumps(metadata).decode() if metadata else None
         )
         db.add(activity)
         db.commit()
@@ -0,0 +1,17 @@
+import secrets
+import string
+
+ALPHANUMERIC = string.ascii_uppercase + string.digits
+
+def random_digits(length: int) -> str:
+    """Random digit string drawn with a single CSPRNG call"""
+    return f"{secrets.randbelow(10 ** length):0{length}d}"
+
+def random_code(length: int) -> str:
+    """Random uppercase alphanumeric string drawn with a single CSPRNG call"""
+    value = secrets.randbelow(len(ALPHANUMERIC) ** length)
+    chars = []
+    for _ in range(length):
+        value, index = divmod(value, len(ALPHANUMERIC))
+        chars.append(ALPHANUMERIC[index])
+    return ''.join(chars)
@@ -0,0 +1,26 @@
+from collections import OrderedDict
+
+class LRUDict(OrderedDict):
+    """Dict bounded to `maxsize` entries that evicts the least recently used key"""
+
+    def __init__(self, maxsize: int):
+        super().__init__()
+        self.maxsize = maxsize
+
+    def __getitem__(self, key):
+        value = super().__getitem__(key)
+        self.move_to_end(key)
+        return value
+
+    def get(self, key, default=None):
+        # OrderedDict.get bypasses __getitem__, so refresh recency here too
+        if key not in self:
+            return default
+        return self[key]
+
+    def __setitem__(self, key, value):
+        if key in self:
+            self.move_to_end(key)
+        super().__setitem__(key, value)
+        if len(self) > self.maxsize:
+            self.popitem(last=False)
@@ -4,8 +4,18 @@ from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
 from app.models.database import Merchant, QRCode, MerchantStatus, BusinessType
 from app.models.schemas import MerchantRegistration, QRCodeRequest
-import json
+import orjson
 import base64
+import io
+from functools import lru_cache
+import segno
+
+@lru_cache(maxsize=1024)
+def render_qr_png(qr_data: str) -> bytes:
+    """Render QR code data as a PNG (cached, since a QR code's data never changes)"""
+    buffer = io.BytesIO()
+    segno.make(qr_data, error='M').save(buffer, kind='png', scale=4)
+    return buffer.getvalue()
 
 class MerchantService:
     """Handles merchant registration, authentication, and QR code generation"""
@@ -142,8 +152,7 @@ class MerchantService:
         }
         
         # Encode as base64 for QR code
-        qr_json = json.dumps(qr_data)
-        qr_encoded = base64.b64encode(qr_json.encode()).decode()
+        qr_encoded = base64.b64encode(orjson.dumps(qr_data)).decode()
         
         return f"fastpay://{qr_encoded}"
 
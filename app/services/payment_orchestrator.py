@@ -39,6 +39,7 @@ class PaymentOrchestrator:
     async def process_settlement(self, payment_data: PaymentRequest, settlement_rail: SettlementRail) -> Dict:
         """Process payment through selected settlement rail"""
 
+        # Concurrency is bounded upstream by the payment pipeline's WorkerPool
         if settlement_rail == SettlementRail.ESWATINI_SWITCH:
             return await self._process_eswatini_switch(payment_data)
         else:
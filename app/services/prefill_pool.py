@@ -0,0 +1,40 @@
+import queue
+import threading
+from typing import Any, Callable
+
+class PrefillPool:
+    """Bounded stock of pre-built items, topped up by a background thread"""
+
+    def __init__(self, produce: Callable[[], Any], maxsize: int = 1000):
+        self.produce = produce
+        self.maxsize = maxsize
+        self._items: queue.Queue = queue.Queue(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self._refilling = False
+
+    def get(self) -> Any:
+        """Take a pre-built item, building one inline if the pool has run dry"""
+        if self._items.qsize() < self.maxsize // 2:
+            self._start_refill()
+        try:
+            return self._items.get_nowait()
+        except queue.Empty:
+            return self.produce()
+
+    def fill(self):
+        """Build items until the pool is full"""
+        try:
+            while not self._items.full():
+                self._items.put_nowait(self.produce())
+        except queue.Full:
+            pass
+        finally:
+            with self._lock:
+                self._refilling = False
+
+    def _start_refill(self):
+        with self._lock:
+            if self._refilling:
+                return
+            self._refilling = True
+        threading.Thread(target=self.fill, daemon=True).start()
@@ -0,0 +1,47 @@
+import re
+import time
+from fastapi.responses import ORJSONResponse
+from app.services.lru_dict import LRUDict
+
+class TokenBucketLimiter:
+    """Per-key token buckets allowing `rate` requests per `period` seconds"""
+
+    def __init__(self, rate: int, period: float = 60.0, max_keys: int = 100_000):
+        self.rate = rate
+        self.period = period
+        # key -> (tokens left, monotonic time of last refill); idle keys are evicted
+        self.buckets = LRUDict(max_keys)
+
+    def allow(self, key: str) -> bool:
+        """Take a token for `key`, returning False when its bucket is empty"""
+        now = time.monotonic()
+        tokens, last = self.buckets.get(key, (self.rate, now))
+
+        # Refill in proportion to the time since the last request
+        tokens = min(self.rate, tokens + (now - last) * self.rate / self.period)
+        if tokens < 1:
+            self.buckets[key] = (tokens, now)
+            return False
+
+        self.buckets[key] = (tokens - 1, now)
+        return True
+
+class RateLimitMiddleware:
+    """ASGI middleware rejecting over-limit clients before routing, body parsing or auth"""
+
+    def __init__(self, app, limiter: TokenBucketLimiter, path_pattern: str, methods=("POST",)):
+        self.app = app
+        self.limiter = limiter
+        self.path_pattern = re.compile(path_pattern)
+        self.methods = frozenset(methods)
+
+    async def __call__(self, scope, receive, send):
+        if (scope["type"] == "http" and scope["method"] in self.methods
+                and self.path_pattern.match(scope["path"])):
+            client = scope.get("client")
+            if not self.limiter.allow(client[0] if client else "unknown"):
+                response = ORJSONResponse({"detail": "Rate limit exceeded"}, status_code=429)
+                await response(scope, receive, send)
+                return
+
+        await self.app(scope, receive, send)
@@ -1,25 +1,51 @@
 import asyncio
 import random
+import time
 from datetime import datetime
 from typing import Dict, List
 from app.models.schemas import PaymentRequest, RiskAssessment
+from app.services.lru_dict import LRUDict
 
 class RiskEngine:
     """Fraud detection and risk assessment"""
 
-    def __init__(self):
-        self.merchant_profiles: Dict = {}
+    def __init__(self, max_merchant_profiles: int = 100_000):
+        # Bounded so cold merchants are evicted instead of growing without limit
+        self.merchant_profiles: Dict = LRUDict(max_merchant_profiles)
         self.suspicious_patterns = {
             "high_amount_threshold": 5000,
             "unusual_hours": [0, 1, 2, 3, 4, 5],  # Late night transactions
             "high_frequency_minutes": 5,
             "max_daily_amount": 50000
         }
+        # (minute since epoch, UTC hour) - the hour only needs recomputing once a minute
+        self._hour_cache = (-1, 0)
 
     async def assess_risk(self, payment_data: PaymentRequest, payment_id: str) -> RiskAssessment:
         """Comprehensive risk assessment"""
         await asyncio.sleep(0.5)  # Simulate ML model processing time
 
+        return self._score(payment_data, payment_id, self._current_hour())
+
+    async def assess_risk_batch(self, payments: List[PaymentRequest], payment_ids: List[str]) -> List[RiskAssessment]:
+        """Assess many payments with one model invocation"""
+        await asyncio.sleep(0.5)  # Simulate ML model processing time, once per batch
+
+        current_hour = self._current_hour()
+        return [
+            self._score(payment_data, payment_id, current_hour)
+            for payment_data, payment_id in zip(payments, payment_ids)
+        ]
+
+    def _current_hour(self) -> int:
+        """Current UTC hour, recomputed at most once per minute"""
+        now_minute = int(time.time() // 60)
+        if now_minute != self._hour_cache[0]:
+            self._hour_cache = (now_minute, datetime.utcfromtimestamp(now_minute * 60).hour)
+        return self._hour_cache[1]
+
+    def _score(self, payment_data: PaymentRequest, payment_id: str, current_hour: int) -> RiskAssessment:
+        """Score a single payment against the risk rules"""
         risk_factors = []
         risk_score = 0.0
 
@@ -29,7 +55,6 @@ class RiskEngine:
             risk_score += 0.3
 
         # Time-based risk
-        current_hour = datetime.utcnow().hour
         if current_hour in self.suspicious_patterns["unusual_hours"]:
             risk_factors.append(f"Unusual transaction time: {current_hour}:00")
             risk_score += 0.2
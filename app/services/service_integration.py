@@ -1,15 +1,61 @@
 import asyncio
 import aiohttp
-import json
+import copy
+import functools
+import time
 from typing import Dict, List, Optional, Any
 from datetime import datetime, timedelta
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from app.models.service_providers import (
     ServiceProvider, ServiceCategory, ServiceTransaction, 
     UtilityBilling, EducationPayment, HospitalityService
 )
-import secrets
-import string
+from app.services.identifiers import random_code, random_digits
+
+def _mkid(prefix: str, length: int) -> str:
+    """Provider reference such as ESW_0123456789"""
+    return f"{prefix}_{random_digits(length)}"
+
+# Balance lookups are read-only and hit repeatedly by screen refreshes and retries
+BALANCE_CACHE_TTL_SECONDS = 30
+BALANCE_CACHE_MAX_ENTRIES = 10_000
+
+def _async_ttl_cache(ttl: float, maxsize: int):
+    """Cache an async method's result per argument tuple for `ttl` seconds.
+
+    The cache lives on the function rather than the instance because
+    ServiceIntegrationFactory hands out a fresh integration per request.
+    Callers get their own copy of the result; `invalidate(*args)` drops an entry.
+    """
+    def decorator(func):
+        cache: Dict[tuple, tuple] = {}
+
+        @functools.wraps(func)
+        async def wrapper(self, *args):
+            now = time.monotonic()
+            entry = cache.get(args)
+            if entry is not None and entry[0] > now:
+                return copy.deepcopy(entry[1])
+
+            result = await func(self, *args)
+
+            if len(cache) >= maxsize:
+                # Drop expired entries first, then the oldest insertions
+                for key in [k for k, (expires, _) in cache.items() if expires <= now]:
+                    del cache[key]
+                while len(cache) >= maxsize:
+                    del cache[next(iter(cache))]
+            cache[args] = (now + ttl, result)
+            return copy.deepcopy(result)
+
+        def invalidate(*args):
+            cache.pop(args, None)
+
+        wrapper.cache = cache
+        wrapper.invalidate = invalidate
+        return wrapper
+    return decorator
 
 class ServiceIntegrationManager:
     """Central manager for all service provider integrations"""
@@ -20,7 +66,7 @@ class ServiceIntegrationManager:
     
     async def register_provider(self, provider_config: Dict) -> str:
         """Register a new service provider"""
-        provider_id = f"PROV_{''.join(secrets.choice(string.ascii_uppercase + string.digits) for _ in range(8))}"
+        provider_id = f"PROV_{random_code(8)}"
         
         # Validate provider configuration
         required_fields = ['provider_name', 'provider_code', 'service_type', 'api_endpoint']
@@ -34,24 +80,27 @@ class ServiceIntegrationManager:
     async def process_service_payment(self, transaction_data: Dict, db: Session) -> Dict:
         """Process payment for any service provider"""
         provider_id = transaction_data.get('provider_id')
-        provider = db.query(ServiceProvider).filter(ServiceProvider.provider_id == provider_id).first()
+        # Only the service type is needed for routing, so skip hydrating the full provider row
+        service_type = db.execute(
+            select(ServiceProvider.service_type).where(ServiceProvider.provider_id == provider_id)
+        ).scalar_one_or_none()
         
-        if not provider:
+        if service_type is None:
             raise ValueError("Service provider not found")
         
         # Route to appropriate service handler
-        if provider.service_type.value == 'utility':
-            return await self._process_utility_payment(transaction_data, provider, db)
-        elif provider.service_type.value == 'government':
-            return await self._process_government_payment(transaction_data, provider, db)
-        elif provider.service_type.value == 'education':
-            return await self._process_education_payment(transaction_data, provider, db)
-        elif provider.service_type.value == 'transport':
-            return await self._process_transport_payment(transaction_data, provider, db)
-        elif provider.service_type.value == 'hospitality':
-            return await self._process_hospitality_payment(transaction_data, provider, db)
+        if service_type.value == 'utility':
+            return await self._process_utility_payment(transaction_data, provider_id, db)
+        elif service_type.value == 'government':
+            return await self._process_government_payment(transaction_data, provider_id, db)
+        elif service_type.value == 'education':
+            return await self._process_education_payment(transaction_data, provider_id, db)
+        elif service_type.value == 'transport':
+            return await self._process_transport_payment(transaction_data, provider_id, db)
+        elif service_type.value == 'hospitality':
+            return await self._process_hospitality_payment(transaction_data, provider_id, db)
         else:
-            raise ValueError(f"Unsupported service type: {provider.service_type}")
+            raise ValueError(f"Unsupported service type: {service_type}")
 
 class UtilityServiceIntegration:
     """Handle utility service payments (EWSC, EEC)"""
@@ -65,6 +114,7 @@ class UtilityServiceIntegration:
         else:
             raise ValueError(f"Unsupported utility provider: {provider_code}")
     
+    @_async_ttl_cache(BALANCE_CACHE_TTL_SECONDS, BALANCE_CACHE_MAX_ENTRIES)
     async def _get_water_balance(self, account_number: str) -> Dict:
         """Get EWSC water account balance"""
         # Simulate EWSC API call
@@ -81,6 +131,7 @@ class UtilityServiceIntegration:
             "status": "active"
         }
     
+    @_async_ttl_cache(BALANCE_CACHE_TTL_SECONDS, BALANCE_CACHE_MAX_ENTRIES)
     async def _get_electricity_balance(self, meter_number: str) -> Dict:
         """Get EEC electricity account balance"""
         # Simulate EEC API call
@@ -109,37 +160,43 @@ class UtilityServiceIntegration:
     
     async def _process_water_payment(self, payment_data: Dict) -> Dict:
         """Process EWSC water bill payment"""
+        # The paid bill must not be served from the balance cache
+        self._get_water_balance.invalidate(payment_data['account_number'])
+
         # Simulate EWSC payment processing
         return {
-            "transaction_id": f"EWSC_{''.join(secrets.choice(string.digits) for _ in range(10))}",
+            "transaction_id": _mkid("EWSC", 10),
             "status": "completed",
             "amount_paid": payment_data['amount'],
             "new_balance": max(0, payment_data.get('current_balance', 0) - payment_data['amount']),
-            "receipt_number": f"RCP_{''.join(secrets.choice(string.digits) for _ in range(8))}",
+            "receipt_number": _mkid("RCP", 8),
             "payment_date": datetime.utcnow().isoformat(),
             "reference": f"Water payment for account {payment_data['account_number']}"
         }
     
     async def _process_electricity_payment(self, payment_data: Dict) -> Dict:
         """Process EEC electricity payment/top-up"""
+        self._get_electricity_balance.invalidate(payment_data['account_number'])
+
         # Generate electricity tokens (simulated)
-        token = ''.join(secrets.choice(string.digits) for _ in range(20))
+        token = random_digits(20)
         
         return {
-            "transaction_id": f"EEC_{''.join(secrets.choice(string.digits) for _ in range(10))}",
+            "transaction_id": _mkid("EEC", 10),
             "status": "completed",
             "amount_paid": payment_data['amount'],
             "units_purchased": round(payment_data['amount'] / 0.85, 2),  # E0.85 per kWh
             "token": token,
             "token_expiry": (datetime.utcnow() + timedelta(days=30)).isoformat(),
             "new_balance": payment_data.get('current_balance', 0) + payment_data['amount'],
-            "receipt_number": f"RCP_{''.join(secrets.choice(string.digits) for _ in range(8))}",
+            "receipt_number": _mkid("RCP", 8),
             "payment_date": datetime.utcnow().isoformat()
         }
 
 class GovernmentServiceIntegration:
     """Handle government service payments (ERS, Police)"""
     
+    @_async_ttl_cache(BALANCE_CACHE_TTL_SECONDS, BALANCE_CACHE_MAX_ENTRIES)
     async def get_tax_liability(self, taxpayer_id: str) -> Dict:
         """Get taxpayer liability from ERS"""
         # Simulate ERS API call
@@ -156,6 +213,7 @@ class GovernmentServiceIntegration:
             "tax_year": "2024"
         }
     
+    @_async_ttl_cache(BALANCE_CACHE_TTL_SECONDS, BALANCE_CACHE_MAX_ENTRIES)
     async def get_police_fines(self, id_number: str) -> List[Dict]:
         """Get outstanding police fines"""
         # Simulate Police system API call
@@ -201,29 +259,33 @@ class GovernmentServiceIntegration:
     
     async def _process_tax_payment(self, payment_data: Dict) -> Dict:
         """Process ERS tax payment"""
+        self.get_tax_liability.invalidate(payment_data['taxpayer_id'])
+
         return {
-            "transaction_id": f"ERS_{''.join(secrets.choice(string.digits) for _ in range(10))}",
+            "transaction_id": _mkid("ERS", 10),
             "status": "completed",
             "amount_paid": payment_data['amount'],
             "taxpayer_id": payment_data['taxpayer_id'],
             "payment_type": payment_data.get('payment_type', 'income_tax'),
             "tax_year": payment_data.get('tax_year', '2024'),
-            "receipt_number": f"TAX_{''.join(secrets.choice(string.digits) for _ in range(8))}",
+            "receipt_number": _mkid("TAX", 8),
             "payment_date": datetime.utcnow().isoformat(),
             "balance_remaining": max(0, payment_data.get('total_due', 0) - payment_data['amount'])
         }
     
     async def _process_fine_payment(self, payment_data: Dict) -> Dict:
         """Process police fine payment"""
+        self.get_police_fines.invalidate(payment_data['identifier'])
+
         return {
-            "transaction_id": f"POLICE_{''.join(secrets.choice(string.digits) for _ in range(10))}",
+            "transaction_id": _mkid("POLICE", 10),
             "status": "completed",
             "amount_paid": payment_data['amount'],
             "fine_id": payment_data['fine_id'],
             "violation_type": payment_data.get('violation_type'),
-            "receipt_number": f"FINE_{''.join(secrets.choice(string.digits) for _ in range(8))}",
+            "receipt_number": _mkid("FINE", 8),
             "payment_date": datetime.utcnow().isoformat(),
-            "clearance_code": f"CLR_{''.join(secrets.choice(string.ascii_uppercase + string.digits) for _ in range(8))}"
+            "clearance_code": f"CLR_{random_code(8)}"
         }
 
 class EducationServiceIntegration:
@@ -238,22 +300,46 @@ class EducationServiceIntegration:
     
     async def _get_university_account(self, student_number: str) -> Dict:
         """Get UNESWA student account"""
+        # Each balance comes from a separate UNESWA system, so fetch them concurrently
+        tuition, accommodation, meals, library = await asyncio.gather(
+            self._fetch_tuition(student_number),
+            self._fetch_accommodation(student_number),
+            self._fetch_meals(student_number),
+            self._fetch_library(student_number)
+        )
+        
         return {
             "student_number": student_number,
             "student_name": "Nomsa Dlamini",
             "faculty": "Faculty of Science and Engineering",
             "year_of_study": "Year 2",
             "current_semester": "Semester 2, 2024",
-            "tuition_balance": 8500.00,
-            "accommodation_balance": 2200.00,
-            "meal_plan_balance": 1800.00,
-            "library_fines": 25.00,
-            "total_outstanding": 12525.00,
-            "last_payment_date": "2024-07-20",
+            "tuition_balance": tuition["balance"],
+            "accommodation_balance": accommodation["balance"],
+            "meal_plan_balance": meals["balance"],
+            "library_fines": library["fines"],
+            "total_outstanding": tuition["balance"] + accommodation["balance"] + meals["balance"] + library["fines"],
+            "last_payment_date": tuition["last_payment_date"],
             "registration_status": "Registered",
             "financial_hold": False
         }
     
+    async def _fetch_tuition(self, student_number: str) -> Dict:
+        """Get tuition balance from the UNESWA finance system"""
+        return {"balance": 8500.00, "last_payment_date": "2024-07-20"}
+    
+    async def _fetch_accommodation(self, student_number: str) -> Dict:
+        """Get residence balance from UNESWA housing"""
+        return {"balance": 2200.00}
+    
+    async def _fetch_meals(self, student_number: str) -> Dict:
+        """Get meal plan balance from UNESWA catering"""
+        return {"balance": 1800.00}
+    
+    async def _fetch_library(self, student_number: str) -> Dict:
+        """Get outstanding fines from the UNESWA library"""
+        return {"fines": 25.00}
+    
     async def _get_school_account(self, school_code: str, student_id: str) -> Dict:
         """Get school student account"""
         return {
@@ -277,13 +363,13 @@ class EducationServiceIntegration:
         fee_type = payment_data.get('fee_type')
         
         return {
-            "transaction_id": f"EDU_{''.join(secrets.choice(string.digits) for _ in range(10))}",
+            "transaction_id": _mkid("EDU", 10),
             "status": "completed",
             "amount_paid": payment_data['amount'],
             "student_id": payment_data['student_id'],
             "fee_type": fee_type,
             "academic_period": payment_data.get('academic_period'),
-            "receipt_number": f"EDU_{''.join(secrets.choice(string.digits) for _ in range(8))}",
+            "receipt_number": _mkid("EDU", 8),
             "payment_date": datetime.utcnow().isoformat(),
             "balance_remaining": max(0, payment_data.get('current_balance', 0) - payment_data['amount']),
             "payment_reference": f"{fee_type.upper()} payment for {payment_data['student_id']}"
@@ -292,21 +378,24 @@ class EducationServiceIntegration:
 class TransportServiceIntegration:
     """Handle transport service payments (EPTC)"""
     
+    # Static route table; treat as read-only since it is shared between requests
+    ROUTES = [
+        {"route_id": "R001", "route_name": "Mbabane - Manzini", "fare": 15.00, "duration": "45 mins"},
+        {"route_id": "R002", "route_name": "Mbabane - Big Bend", "fare": 25.00, "duration": "90 mins"},
+        {"route_id": "R003", "route_name": "Manzini - Siteki", "fare": 20.00, "duration": "75 mins"},
+        {"route_id": "R004", "route_name": "Mbabane - Piggs Peak", "fare": 18.00, "duration": "60 mins"}
+    ]
+    
     async def get_available_routes(self) -> List[Dict]:
         """Get available transport routes"""
-        return [
-            {"route_id": "R001", "route_name": "Mbabane - Manzini", "fare": 15.00, "duration": "45 mins"},
-            {"route_id": "R002", "route_name": "Mbabane - Big Bend", "fare": 25.00, "duration": "90 mins"},
-            {"route_id": "R003", "route_name": "Manzini - Siteki", "fare": 20.00, "duration": "75 mins"},
-            {"route_id": "R004", "route_name": "Mbabane - Piggs Peak", "fare": 18.00, "duration": "60 mins"}
-        ]
+        return self.ROUTES
     
     async def purchase_transport_voucher(self, voucher_data: Dict) -> Dict:
         """Purchase transport voucher"""
-        voucher_code = ''.join(secrets.choice(string.ascii_uppercase + string.digits) for _ in range(8))
+        voucher_code = random_code(8)
         
         return {
-            "transaction_id": f"EPTC_{''.join(secrets.choice(string.digits) for _ in range(10))}",
+            "transaction_id": _mkid("EPTC", 10),
             "status": "completed",
             "voucher_code": voucher_code,
             "route_id": voucher_data['route_id'],
@@ -316,46 +405,49 @@ class TransportServiceIntegration:
             "valid_until": (datetime.utcnow() + timedelta(days=30)).isoformat(),
             "passenger_type": voucher_data.get('passenger_type', 'adult'),
             "qr_code_data": f"EPTC:{voucher_code}:{voucher_data['route_id']}",
-            "receipt_number": f"EPTC_{''.join(secrets.choice(string.digits) for _ in range(8))}"
+            "receipt_number": _mkid("EPTC", 8)
         }
 
 class HospitalityServiceIntegration:
     """Handle hospitality service payments (Hotels, Restaurants)"""
     
+    # Static hotel listing; treat as read-only since it is shared between requests
+    HOTELS = [
+        {
+            "hotel_id": "HTL001",
+            "hotel_name": "Esibayeni Lodge",
+            "location": "Ezulwini Valley",
+            "room_types": [
+                {"type": "Standard", "price": 850.00, "available": True},
+                {"type": "Deluxe", "price": 1200.00, "available": True},
+                {"type": "Suite", "price": 1800.00, "available": False}
+            ],
+            "amenities": ["WiFi", "Swimming Pool", "Restaurant", "Spa"],
+            "rating": 4.5
+        },
+        {
+            "hotel_id": "HTL002", 
+            "hotel_name": "Mountain Inn",
+            "location": "Mbabane",
+            "room_types": [
+                {"type": "Standard", "price": 650.00, "available": True},
+                {"type": "Executive", "price": 950.00, "available": True}
+            ],
+            "amenities": ["WiFi", "Restaurant", "Conference Rooms"],
+            "rating": 4.0
+        }
+    ]
+    
     async def search_hotels(self, search_criteria: Dict) -> List[Dict]:
         """Search available hotels"""
-        return [
-            {
-                "hotel_id": "HTL001",
-                "hotel_name": "Esibayeni Lodge",
-                "location": "Ezulwini Valley",
-                "room_types": [
-                    {"type": "Standard", "price": 850.00, "available": True},
-                    {"type": "Deluxe", "price": 1200.00, "available": True},
-                    {"type": "Suite", "price": 1800.00, "available": False}
-                ],
-                "amenities": ["WiFi", "Swimming Pool", "Restaurant", "Spa"],
-                "rating": 4.5
-            },
-            {
-                "hotel_id": "HTL002", 
-                "hotel_name": "Mountain Inn",
-                "location": "Mbabane",
-                "room_types": [
-                    {"type": "Standard", "price": 650.00, "available": True},
-                    {"type": "Executive", "price": 950.00, "available": True}
-                ],
-                "amenities": ["WiFi", "Restaurant", "Conference Rooms"],
-                "rating": 4.0
-            }
-        ]
+        return self.HOTELS
     
     async def make_hotel_booking(self, booking_data: Dict) -> Dict:
         """Make hotel booking and process payment"""
-        booking_reference = f"BK{''.join(secrets.choice(string.ascii_uppercase + string.digits) for _ in range(8))}"
+        booking_reference = f"BK{random_code(8)}"
         
         return {
-            "transaction_id": f"HTL_{''.join(secrets.choice(string.digits) for _ in range(10))}",
+            "transaction_id": _mkid("HTL", 10),
             "booking_reference": booking_reference,
             "status": "confirmed",
             "hotel_id": booking_data['hotel_id'],
@@ -373,7 +465,7 @@ class HospitalityServiceIntegration:
     async def process_restaurant_payment(self, payment_data: Dict) -> Dict:
         """Process restaurant payment"""
         return {
-            "transaction_id": f"REST_{''.join(secrets.choice(string.digits) for _ in range(10))}",
+            "transaction_id": _mkid("REST", 10),
             "status": "completed",
             "restaurant_name": payment_data['restaurant_name'],
             "table_number": payment_data.get('table_number'),
@@ -382,7 +474,7 @@ class HospitalityServiceIntegration:
             "tip_amount": payment_data.get('tip_amount', 0.00),
             "total_amount": payment_data['amount'] + payment_data.get('tip_amount', 0.00),
             "payment_date": datetime.utcnow().isoformat(),
-            "receipt_number": f"REST_{''.join(secrets.choice(string.digits) for _ in range(8))}",
+            "receipt_number": _mkid("REST", 8),
             "payment_method": "Fast Pay Digital"
         }
 
@@ -1,56 +1,135 @@
-import secrets
-import string
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 from sqlalchemy.orm import Session
 from app.models.service_providers import VisaCard, CardTransaction
+from app.services.identifiers import random_code, random_digits
+from app.services.prefill_pool import PrefillPool
 import hashlib
-import json
+import secrets
 from cryptography.fernet import Fernet
 import os
+try:
+    from numba import njit
+except ImportError:
+    def njit(*args, **kwargs):
+        """Run the numeric kernels as plain Python when numba is not installed"""
+        return lambda func: func
+try:
+    # Rust-backed Fernet; tokens are interchangeable with cryptography's
+    from rfernet import Fernet as RustFernet
+except ImportError:
+    RustFernet = None
+
+# (daily, monthly) spending limits per card variant
+_CARD_LIMITS = {
+    'youth': (1000.00, 5000.00),        # Youth cards have lower limits
+    'physical': (5000.00, 50000.00),    # Standard physical cards
+    'virtual': (3000.00, 30000.00),     # Virtual cards - slightly lower
+    'corporate': (10000.00, 100000.00)  # Corporate cards - higher limits
+}
+
+_HIGH_RISK_CATEGORIES = frozenset({'gambling', 'adult_entertainment', 'crypto'})
+
+# Luhn doubling with the digit-sum folded in: d -> 2d if 2d < 10 else 2d - 9
+_LUHN_DOUBLED = (0, 2, 4, 6, 8, 1, 3, 5, 7, 9)
+
+@njit(cache=True)
+def _luhn_check_digit(payload: int) -> int:
+    """Luhn check digit for a card number payload given as an integer"""
+    # The check digit is appended on the right, so the rightmost payload
+    # digit is the first one doubled
+    total = 0
+    double = True
+    while payload:
+        digit = payload % 10
+        total += _LUHN_DOUBLED[digit] if double else digit
+        double = not double
+        payload //= 10
+    return (10 - (total % 10)) % 10
+
+@njit(cache=True)
+def _card_risk_score(amount: float, daily_limit: float, is_international: bool,
+                     is_high_risk_category: bool, hour: int) -> float:
+    """Transaction risk score (0.0 = low risk, 1.0 = high risk)"""
+    risk_score = 0.0
+
+    # Large transaction risk
+    if amount > daily_limit * 0.5:
+        risk_score += 0.3
+
+    # International transaction risk
+    if is_international:
+        risk_score += 0.2
+
+    # Unusual merchant category
+    if is_high_risk_category:
+        risk_score += 0.4
+
+    # Time-based risk (late night transactions)
+    if hour < 6 or hour > 23:
+        risk_score += 0.1
+
+    return min(risk_score, 1.0)
+
+# Compile the kernels at import so the first card request doesn't pay for it
+_luhn_check_digit(453201511283036)
+_card_risk_score(100.0, 5000.0, False, False, 12)
+
+class RustFernetCipher:
+    """Adapts rfernet's str-based API to cryptography's bytes-based Fernet API"""
+
+    def __init__(self, key):
+        self._fernet = RustFernet(key.decode() if isinstance(key, bytes) else key)
+
+    def encrypt(self, data: bytes) -> bytes:
+        return self._fernet.encrypt(data).encode()
+
+    def decrypt(self, token: bytes) -> bytes:
+        return self._fernet.decrypt(token.decode())
+
+# In production, store this securely. Without a configured key one is generated
+# once per process, so every service instance can decrypt the others' data
+_ENCRYPTION_KEY = os.getenv('CARD_ENCRYPTION_KEY') or Fernet.generate_key()
+_CIPHER = RustFernetCipher(_ENCRYPTION_KEY) if RustFernet else Fernet(_ENCRYPTION_KEY)
 
 class VisaCardService:
     """Service for managing Visa prepaid cards"""
     
     def __init__(self):
-        # In production, store this securely
-        self.encryption_key = os.getenv('CARD_ENCRYPTION_KEY', Fernet.generate_key())
-        self.cipher = Fernet(self.encryption_key)
+        self.encryption_key = _ENCRYPTION_KEY
+        self.cipher = _CIPHER
+        # PAN/CVV generation and encryption happen off the request path
+        self.card_material = PrefillPool(self._generate_card_material, maxsize=1000)
     
     def generate_card_number(self) -> str:
         """Generate a valid Visa card number"""
-        # Visa cards start with 4
-        prefix = "4532"  # Test Visa prefix
+        # Test Visa prefix 4532 followed by 11 random digits, all as one integer
+        payload = 4532_0000_0000_000 + secrets.randbelow(10**11)
         
-        # Generate 12 random digits
-        middle_digits = ''.join(secrets.choice(string.digits) for _ in range(12))
-        
-        # Calculate Luhn check digit
-        card_without_check = prefix + middle_digits
-        check_digit = self._calculate_luhn_check_digit(card_without_check)
-        
-        return card_without_check + str(check_digit)
+        # Append the Luhn check digit to make 16 digits
+        return f"{payload * 10 + _luhn_check_digit(payload):016d}"
+    
+    def _generate_card_material(self) -> tuple:
+        """Encrypted card number, encrypted CVV and masked number for one card"""
+        # Only ciphertexts are kept, so the pooled stock never holds a plaintext PAN or CVV
+        card_number = self.generate_card_number()
+        return (
+            self.encrypt_sensitive_data(card_number),
+            self.encrypt_sensitive_data(self.generate_cvv()),
+            self._mask_card_number(card_number)
+        )
     
     def _calculate_luhn_check_digit(self, card_number: str) -> int:
         """Calculate Luhn algorithm check digit"""
-        digits = [int(d) for d in card_number]
-        
-        # Double every second digit from right
-        for i in range(len(digits) - 2, -1, -2):
-            digits[i] *= 2
-            if digits[i] > 9:
-                digits[i] = digits[i] // 10 + digits[i] % 10
-        
-        total = sum(digits)
-        return (10 - (total % 10)) % 10
+        return _luhn_check_digit(int(card_number))
     
     def generate_cvv(self) -> str:
         """Generate a 3-digit CVV"""
-        return ''.join(secrets.choice(string.digits) for _ in range(3))
+        return random_digits(3)
     
     def generate_expiry_date(self, years_valid: int = 3) -> str:
         """Generate expiry date (MM/YYYY format)"""
-        expiry = datetime.now() + timedelta(days=365 * years_valid)
+        expiry = datetime.utcnow() + timedelta(days=365 * years_valid)
         return expiry.strftime("%m/%Y")
     
     def encrypt_sensitive_data(self, data: str) -> str:
@@ -63,18 +142,14 @@ class VisaCardService:
     
     def issue_card(self, customer_id: str, card_request: Dict, db: Session) -> Dict:
         """Issue a new Visa prepaid card"""
+        now = datetime.utcnow()
         
-        # Generate card details
-        card_number = self.generate_card_number()
-        cvv = self.generate_cvv()
+        # Generate card details (number and CVV come pre-encrypted from the pool)
+        encrypted_card_number, encrypted_cvv, masked_number = self.card_material.get()
         expiry_date = self.generate_expiry_date()
         
         # Generate card ID
-        card_id = f"CARD_{''.join(secrets.choice(string.ascii_uppercase + string.digits) for _ in range(8))}"
-        
-        # Encrypt sensitive data
-        encrypted_card_number = self.encrypt_sensitive_data(card_number)
-        encrypted_cvv = self.encrypt_sensitive_data(cvv)
+        card_id = f"CARD_{random_code(8)}"
         
         # Set limits based on card type
         daily_limit, monthly_limit = self._get_card_limits(card_request.get('card_variant', 'physical'))
@@ -84,6 +159,7 @@ class VisaCardService:
             card_id=card_id,
             customer_id=customer_id,
             card_number_encrypted=encrypted_card_number,
+            card_number_masked=masked_number,
             card_type='prepaid',
             card_variant=card_request.get('card_variant', 'physical'),
             cardholder_name=card_request['cardholder_name'],
@@ -99,12 +175,11 @@ class VisaCardService:
         
         db.add(visa_card)
         db.commit()
-        db.refresh(visa_card)
         
         # Return card details (masked for security)
         return {
             "card_id": card_id,
-            "card_number_masked": self._mask_card_number(card_number),
+            "card_number_masked": masked_number,
             "cardholder_name": card_request['cardholder_name'],
             "expiry_date": expiry_date,
             "card_variant": card_request.get('card_variant', 'physical'),
@@ -112,19 +187,13 @@ class VisaCardService:
             "monthly_limit": monthly_limit,
             "status": "active",
             "international_enabled": card_request.get('international_enabled', False),
-            "issued_date": datetime.now().isoformat(),
+            "issued_date": now,
             "message": "Visa prepaid card issued successfully"
         }
     
     def _get_card_limits(self, card_variant: str) -> tuple:
         """Get spending limits based on card variant"""
-        limits = {
-            'youth': (1000.00, 5000.00),      # Youth cards have lower limits
-            'physical': (5000.00, 50000.00),  # Standard physical cards
-            'virtual': (3000.00, 30000.00),   # Virtual cards - slightly lower
-            'corporate': (10000.00, 100000.00) # Corporate cards - higher limits
-        }
-        return limits.get(card_variant, (5000.00, 50000.00))
+        return _CARD_LIMITS.get(card_variant, _CARD_LIMITS['physical'])
     
     def _mask_card_number(self, card_number: str) -> str:
         """Mask card number for display (show first 4 and last 4 digits)"""
@@ -145,7 +214,8 @@ class VisaCardService:
         card.available_balance += amount
         
         # Create transaction record
-        transaction_id = f"TXN_{''.join(secrets.choice(string.ascii_uppercase + string.digits) for _ in range(10))}"
+        now = datetime.utcnow()
+        transaction_id = f"TXN_{random_code(10)}"
         
         transaction = CardTransaction(
             transaction_id=transaction_id,
@@ -154,9 +224,9 @@ class VisaCardService:
             amount=amount,
             status='approved',
             merchant_name='Fast Pay Top-Up',
-            authorization_code=f"AUTH_{''.join(secrets.choice(string.digits) for _ in range(6))}",
+            authorization_code=f"AUTH_{random_digits(6)}",
             reference_number=transaction_id,
-            processed_at=datetime.now()
+            processed_at=now
         )
         
         db.add(transaction)
@@ -168,7 +238,7 @@ class VisaCardService:
             "amount_loaded": amount,
             "new_balance": card.balance,
             "available_balance": card.available_balance,
-            "transaction_date": datetime.now().isoformat(),
+            "transaction_date": now,
             "status": "completed"
         }
     
@@ -177,6 +247,7 @@ class VisaCardService:
         card_id = transaction_data['card_id']
         amount = transaction_data['amount']
         transaction_type = transaction_data.get('transaction_type', 'purchase')
+        now = datetime.utcnow()
         
         card = db.query(VisaCard).filter(VisaCard.card_id == card_id).first()
         
@@ -184,7 +255,7 @@ class VisaCardService:
             raise ValueError("Card not found")
         
         # Validate transaction
-        validation_result = self._validate_transaction(card, amount, transaction_data)
+        validation_result = self._validate_transaction(card, amount, transaction_data, now)
         if not validation_result['valid']:
             return {
                 "status": "declined",
@@ -193,7 +264,7 @@ class VisaCardService:
             }
         
         # Process transaction
-        transaction_id = f"TXN_{''.join(secrets.choice(string.ascii_uppercase + string.digits) for _ in range(10))}"
+        transaction_id = f"TXN_{random_code(10)}"
         
         # Update card balance
         if transaction_type in ['purchase', 'withdrawal']:
@@ -201,7 +272,7 @@ class VisaCardService:
             card.total_transactions += 1
             card.total_spent += amount
         
-        card.last_used = datetime.now()
+        card.last_used = now
         
         # Create transaction record
         transaction = CardTransaction(
@@ -213,12 +284,12 @@ class VisaCardService:
             merchant_category=transaction_data.get('merchant_category'),
             merchant_location=transaction_data.get('merchant_location'),
             merchant_country=transaction_data.get('merchant_country', 'Eswatini'),
-            authorization_code=f"AUTH_{''.join(secrets.choice(string.digits) for _ in range(6))}",
+            authorization_code=f"AUTH_{random_digits(6)}",
             reference_number=transaction_data.get('reference_number', transaction_id),
             status='approved',
             is_international=transaction_data.get('merchant_country', 'Eswatini') != 'Eswatini',
             risk_score=validation_result.get('risk_score', 0.1),
-            processed_at=datetime.now()
+            processed_at=now
         )
         
         db.add(transaction)
@@ -230,11 +301,11 @@ class VisaCardService:
             "amount": amount,
             "available_balance": card.available_balance,
             "authorization_code": transaction.authorization_code,
-            "transaction_date": datetime.now().isoformat(),
+            "transaction_date": now,
             "merchant_name": transaction_data.get('merchant_name', 'Unknown Merchant')
         }
     
-    def _validate_transaction(self, card: VisaCard, amount: float, transaction_data: Dict) -> Dict:
+    def _validate_transaction(self, card: VisaCard, amount: float, transaction_data: Dict, now: datetime) -> Dict:
         """Validate transaction against card limits and status"""
         
         # Check card status
@@ -246,13 +317,13 @@ class VisaCardService:
             return {"valid": False, "reason": "Insufficient funds"}
         
         # Check daily limit
-        today = datetime.now().date()
+        today = now.date()
         daily_spent = self._get_daily_spending(card.card_id, today)
         if daily_spent + amount > card.daily_limit:
             return {"valid": False, "reason": "Daily limit exceeded"}
         
         # Check monthly limit
-        this_month = datetime.now().replace(day=1).date()
+        this_month = today.replace(day=1)
         monthly_spent = self._get_monthly_spending(card.card_id, this_month)
         if monthly_spent + amount > card.monthly_limit:
             return {"valid": False, "reason": "Monthly limit exceeded"}
@@ -263,7 +334,7 @@ class VisaCardService:
             return {"valid": False, "reason": "International transactions not enabled"}
         
         # Calculate risk score (simple implementation)
-        risk_score = self._calculate_risk_score(card, amount, transaction_data)
+        risk_score = self._calculate_risk_score(card, amount, transaction_data, now.hour)
         
         return {
             "valid": True,
@@ -282,29 +353,15 @@ class VisaCardService:
         # Simplified for demo
         return 0.0
     
-    def _calculate_risk_score(self, card: VisaCard, amount: float, transaction_data: Dict) -> float:
+    def _calculate_risk_score(self, card: VisaCard, amount: float, transaction_data: Dict, hour: int) -> float:
         """Calculate transaction risk score (0.0 = low risk, 1.0 = high risk)"""
-        risk_score = 0.0
-        
-        # Large transaction risk
-        if amount > card.daily_limit * 0.5:
-            risk_score += 0.3
-        
-        # International transaction risk
-        if transaction_data.get('merchant_country', 'Eswatini') != 'Eswatini':
-            risk_score += 0.2
-        
-        # Unusual merchant category
-        high_risk_categories = ['gambling', 'adult_entertainment', 'crypto']
-        if transaction_data.get('merchant_category') in high_risk_categories:
-            risk_score += 0.4
-        
-        # Time-based risk (late night transactions)
-        current_hour = datetime.now().hour
-        if current_hour < 6 or current_hour > 23:
-            risk_score += 0.1
-        
-        return min(risk_score, 1.0)
+        return _card_risk_score(
+            float(amount),
+            float(card.daily_limit),
+            transaction_data.get('merchant_country', 'Eswatini') != 'Eswatini',
+            transaction_data.get('merchant_category') in _HIGH_RISK_CATEGORIES,
+            hour
+        )
     
     def get_card_details(self, card_id: str, db: Session) -> Dict:
         """Get card details (masked for security)"""
@@ -313,9 +370,10 @@ class VisaCardService:
         if not card:
             raise ValueError("Card not found")
         
-        # Decrypt and mask card number
-        card_number = self.decrypt_sensitive_data(card.card_number_encrypted)
-        masked_number = self._mask_card_number(card_number)
+        masked_number = card.card_number_masked
+        if not masked_number:
+            # Cards issued before the masked number was stored
+            masked_number = self._mask_card_number(self.decrypt_sensitive_data(card.card_number_encrypted))
         
         return {
             "card_id": card.card_id,
@@ -331,8 +389,8 @@ class VisaCardService:
             "international_enabled": card.international_enabled,
             "total_transactions": card.total_transactions,
             "total_spent": card.total_spent,
-            "last_used": card.last_used.isoformat() if card.last_used else None,
-            "issued_date": card.issued_date.isoformat()
+            "last_used": card.last_used,
+            "issued_date": card.issued_date
         }
     
     def get_card_transactions(self, card_id: str, limit: int = 50, db: Session = None) -> List[Dict]:
@@ -349,7 +407,7 @@ class VisaCardService:
                 "merchant_name": txn.merchant_name,
                 "merchant_location": txn.merchant_location,
                 "status": txn.status,
-                "transaction_date": txn.transaction_date.isoformat(),
+                "transaction_date": txn.transaction_date,
                 "authorization_code": txn.authorization_code,
                 "is_international": txn.is_international
             }
@@ -370,7 +428,7 @@ class VisaCardService:
             "card_id": card_id,
             "status": "blocked",
             "reason": reason,
-            "blocked_at": datetime.now().isoformat()
+            "blocked_at": datetime.utcnow()
         }
     
     def unblock_card(self, card_id: str, db: Session) -> Dict:
@@ -386,5 +444,5 @@ class VisaCardService:
         return {
             "card_id": card_id,
             "status": "active",
-            "unblocked_at": datetime.now().isoformat()
+            "unblocked_at": datetime.utcnow()
         }
\ No newline at end of file
@@ -0,0 +1,84 @@
+import asyncio
+from typing import Any, Awaitable, Callable, List, Optional
+
+class WorkerPool:
+    """Fixed pool of worker coroutines draining a bounded job queue"""
+
+    def __init__(self, handler: Callable[..., Awaitable[Any]], workers: int, maxsize: int = 1000):
+        self.handler = handler
+        self.workers = workers
+        self.maxsize = maxsize
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def start(self):
+        """Spawn the workers on the running event loop (no-op if already running)"""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+
+        # Queues and tasks are bound to one loop, so a new loop needs fresh workers
+        self._loop = loop
+        self._queue = asyncio.Queue(maxsize=self.maxsize)
+        self._tasks = [loop.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self, timeout: float = 10.0) -> List[tuple]:
+        """Let queued jobs finish for up to `timeout` seconds, then cancel the workers
+
+        Returns the arguments of jobs still queued when the workers were cancelled,
+        so the caller can record that they never ran.
+        """
+        dropped = []
+        if self._queue is not None:
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+        while self._queue is not None and not self._queue.empty():
+            args, future = self._queue.get_nowait()
+            if future is not None:
+                future.cancel()
+            dropped.append(args)
+
+        self._tasks = []
+        self._queue = None
+        self._loop = None
+        return dropped
+
+    async def submit(self, *args) -> Any:
+        """Queue a job and wait for its result (blocks while the queue is full)"""
+        self.start()
+        future = self._loop.create_future()
+        await self._queue.put((args, future))
+        return await future
+
+    async def enqueue(self, *args):
+        """Queue a job without waiting for it to run"""
+        self.start()
+        await self._queue.put((args, None))
+
+    async def _worker(self):
+        while True:
+            args, future = await self._queue.get()
+            try:
+                result = await self.handler(*args)
+            except asyncio.CancelledError:
+                if future is not None:
+                    future.cancel()
+                raise
+            except Exception as e:
+                if future is None:
+                    print(f"⚠️ Background job failed: {e}")
+                elif not future.cancelled():
+                    future.set_exception(e)
+            else:
+                if future is not None and not future.cancelled():
+                    future.set_result(result)
+            finally:
+                self._queue.task_done()
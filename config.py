@@ -6,6 +6,8 @@ class Config:
     
     # Database
     DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./payments.db")
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "40"))
     
     # API Settings
     API_HOST = os.getenv("API_HOST", "0.0.0.0")
@@ -18,6 +20,9 @@ class Config:
     
     # Rate Limiting
     RATE_LIMIT_PER_MINUTE = int(os.getenv("RATE_LIMIT_PER_MINUTE", "10"))
+    RATE_LIMIT_PER_IP_PER_SECOND = int(os.getenv("RATE_LIMIT_PER_IP_PER_SECOND", "10"))
+    # Proxies whose X-Forwarded-For is trusted for the client address (same variable as uvicorn's)
+    FORWARDED_ALLOW_IPS = os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1")
     
     # Risk Engine Settings
     RISK_CONFIG = {
@@ -1,32 +1,56 @@
-from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Depends, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse
-from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import HTMLResponse, ORJSONResponse
+from uvicorn.middleware.proxy_headers import ProxyHeadersMiddleware
+from sqlalchemy import case, func, insert
+from sqlalchemy.orm import Session, selectinload
+import asyncio
+import hashlib
+import time
+import uuid
+from dataclasses import dataclass, field
 from datetime import datetime
-import json
+from typing import List, Optional
 
 from app.models.database import (
-    get_db, init_db, Payment, Transaction, PaymentStatus, Merchant, QRCode
+    get_db, init_db, SessionLocal, Payment, Transaction, PaymentStatus, SettlementRail, Merchant, QRCode
 )
 from app.models.schemas import (
     PaymentRequest, PaymentResponse, MerchantRegistration, MerchantResponse,
-    QRCodeRequest, QRCodeResponse, PaymentInitiation
+    QRCodeRequest, QRCodeResponse, QRCodeListItem, PaymentInitiation
 )
 from app.services.api_gateway import APIGateway
 from app.services.risk_engine import RiskEngine
 from app.services.payment_orchestrator import PaymentOrchestrator
-from app.services.merchant_service import MerchantService
+from app.services.merchant_service import MerchantService, render_qr_png
+from app.services.worker_pool import WorkerPool
+from app.services.rate_limiter import RateLimitMiddleware, TokenBucketLimiter
 from app.api.service_endpoints import router as service_router
 from app.api.auth_endpoints import router as auth_router
+from config import config
 
 # FastAPI App
 app = FastAPI(
     title="Eswatini Payment System MVP",
     description="End-to-end payment processing demonstration",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
+# Per-client limit on payment and QR creation, checked before the request reaches
+# a handler. Added before CORS so 429s still carry CORS headers
+app.add_middleware(
+    RateLimitMiddleware,
+    limiter=TokenBucketLimiter(config.RATE_LIMIT_PER_IP_PER_SECOND, period=1.0),
+    path_pattern=r"^/api/v1/(payments(/initiate)?|merchants/[^/]+/qr-codes)$"
+)
+
+# Every deployment sits behind a proxy, so take the client address from the trusted
+# proxy's X-Forwarded-For before the limiter keys on it
+app.add_middleware(ProxyHeadersMiddleware, trusted_hosts=config.FORWARDED_ALLOW_IPS)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -60,6 +84,7 @@ async def register_merchant(
     """Register a new merchant"""
     try:
         merchant = merchant_service.register_merchant(registration, db)
+        api_gateway.invalidate_merchant(merchant.merchant_id)
         
         return MerchantResponse(
             merchant_id=merchant.merchant_id,
@@ -94,6 +119,7 @@ async def get_merchant_details(merchant_id: str, db: Session = Depends(get_db)):
 async def generate_qr_code(
     merchant_id: str,
     qr_request: QRCodeRequest,
+    request: Request,
     db: Session = Depends(get_db)
 ):
     """Generate QR code for merchant"""
@@ -101,44 +127,35 @@ async def generate_qr_code(
         qr_code = merchant_service.generate_qr_code(merchant_id, qr_request, db)
         qr_data = merchant_service.generate_qr_data(qr_code)
         
-        # Generate QR code image with URL encoding
-        import urllib.parse
-        qr_url = f"https://api.qrserver.com/v1/create-qr-code/?data={urllib.parse.quote(qr_data)}&size=200x200"
-        
         return QRCodeResponse(
             qr_code_id=qr_code.qr_code_id,
             qr_code_data=qr_data,
-            qr_code_url=qr_url,
+            qr_code_url=str(request.url_for("qr_code_image", qr_code_id=qr_code.qr_code_id)),
             expires_at=qr_code.expires_at,
             is_dynamic=qr_code.is_dynamic
         )
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-@app.get("/api/v1/merchants/{merchant_id}/qr-codes")
+@app.get("/qr/{qr_code_id}.png")
+async def qr_code_image(qr_code_id: str, db: Session = Depends(get_db)):
+    """Render a QR code as PNG"""
+    qr_code = db.query(QRCode).filter(QRCode.qr_code_id == qr_code_id).first()
+    if not qr_code:
+        raise HTTPException(status_code=404, detail="QR code not found")
+
+    png = render_qr_png(merchant_service.generate_qr_data(qr_code))
+    return Response(content=png, media_type="image/png", headers={"Cache-Control": "public, max-age=3600"})
+
+@app.get("/api/v1/merchants/{merchant_id}/qr-codes", response_model=List[QRCodeListItem])
 async def get_merchant_qr_codes(merchant_id: str, db: Session = Depends(get_db)):
     """Get all QR codes for merchant"""
-    qr_codes = merchant_service.get_merchant_qr_codes(merchant_id, db)
-    
-    return [
-        {
-            "qr_code_id": qr.qr_code_id,
-            "amount": qr.amount,
-            "description": qr.description,
-            "is_dynamic": qr.is_dynamic,
-            "expires_at": qr.expires_at,
-            "usage_count": qr.usage_count,
-            "max_usage": qr.max_usage,
-            "is_active": qr.is_active,
-            "created_at": qr.created_at
-        }
-        for qr in qr_codes
-    ]
+    # Rows are read straight into QRCodeListItem, with no intermediate dicts
+    return merchant_service.get_merchant_qr_codes(merchant_id, db)
 
-@app.post("/api/v1/payments/initiate", response_model=PaymentResponse)
+@app.post("/api/v1/payments/initiate", response_model=PaymentResponse, status_code=202)
 async def initiate_payment(
     payment_initiation: PaymentInitiation,
-    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db)
 ):
     """Initiate payment via QR code or direct"""
@@ -169,45 +186,60 @@ async def initiate_payment(
     )
     
     # Process through normal payment pipeline
-    return await create_payment(payment_request, background_tasks, db)
-
-def log_transaction(db: Session, payment_id: str, step: str, status: str, details: dict):
-    """Log each step of the payment process"""
-    transaction = Transaction(
-        payment_id=payment_id,
-        step=step,
-        status=status,
-        details=json.dumps(details)
-    )
-    db.add(transaction)
-    db.commit()
+    return await create_payment(payment_request, db)
+
+@dataclass
+class PaymentContext:
+    """A payment moving through the pipeline, with its buffered transaction log"""
+    payment_id: str
+    request: PaymentRequest
+    logs: List[dict] = field(default_factory=list)
+
+    def log(self, step: str, status: str, details: dict):
+        """Log a step of the payment process (written by write_transaction_logs)"""
+        self.logs.append({
+            "payment_id": self.payment_id,
+            "step": step,
+            "status": status,
+            "details": details,
+            # Stamp at log time; the row may be written several steps later
+            "timestamp": datetime.utcnow()
+        })
+
+def write_transaction_logs(db: Session, ctx: PaymentContext):
+    """Insert buffered log rows in one executemany, bypassing the ORM unit of work"""
+    if ctx.logs:
+        db.execute(insert(Transaction), ctx.logs)
+        ctx.logs.clear()
 
 @app.on_event("startup")
 async def startup_event():
-    """Initialize database on startup"""
-    try:
-        init_db()
-        print("✅ Database initialized successfully")
-    except Exception as e:
-        print(f"⚠️ Database initialization warning: {e}")
+    """Initialize database and preload pages on startup"""
+    # Both are blocking I/O, so run them side by side off the event loop
+    db_result, pages_result = await asyncio.gather(
+        asyncio.to_thread(init_db),
+        asyncio.to_thread(preload_pages),
+        return_exceptions=True
+    )
+    if isinstance(db_result, Exception):
+        print(f"⚠️ Database initialization warning: {db_result}")
         # Continue anyway for serverless environments
+    else:
+        print("✅ Database initialized successfully")
 
-@app.post("/api/v1/payments", response_model=PaymentResponse)
-async def create_payment(
-    payment_request: PaymentRequest,
-    background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db)
-):
-    """Main payment processing endpoint"""
-
-    # Step 1: API Gateway - Authentication & Rate Limiting
-    if not api_gateway.authenticate_request(payment_request.merchant_id, db):
-        raise HTTPException(status_code=401, detail="Invalid merchant credentials")
+    if isinstance(pages_result, Exception):
+        # Pages that failed to preload are read again on first request
+        print(f"⚠️ Page preload warning: {pages_result}")
 
-    if not api_gateway.check_rate_limit(payment_request.merchant_id):
-        raise HTTPException(status_code=429, detail="Rate limit exceeded")
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Drain the payment pipeline, failing payments it could not finish"""
+    dropped = await payment_pipeline.stop(timeout=PIPELINE_DRAIN_TIMEOUT_SECONDS)
+    if dropped:
+        await asyncio.to_thread(fail_dropped_payments, [ctx for (ctx,) in dropped])
 
-    # Create payment record
+def record_pending_payment(payment_request: PaymentRequest, db: Session) -> PaymentContext:
+    """Insert the PENDING payment and its gateway log row, then commit"""
     payment = Payment(
         merchant_id=payment_request.merchant_id,
         customer_id=payment_request.customer_id,
@@ -216,107 +248,167 @@ async def create_payment(
         status=PaymentStatus.PENDING
     )
     db.add(payment)
-    db.commit()
-    db.refresh(payment)
+    db.flush()
 
-    log_transaction(db, payment.id, "api_gateway", "success", {
+    ctx = PaymentContext(payment.id, payment_request)
+    ctx.log("api_gateway", "success", {
         "message": "Payment request validated and accepted"
     })
+    write_transaction_logs(db, ctx)
+    db.commit()
+    return ctx
+
+@app.post("/api/v1/payments", response_model=PaymentResponse, status_code=202)
+async def create_payment(
+    payment_request: PaymentRequest,
+    db: Session = Depends(get_db)
+):
+    """Main payment processing endpoint"""
+
+    # Step 1: API Gateway - Authentication & Rate Limiting
+    # Blocking database work runs in the threadpool so the event loop keeps serving
+    if not await run_in_threadpool(api_gateway.authenticate_request, payment_request.merchant_id, db):
+        raise HTTPException(status_code=401, detail="Invalid merchant credentials")
+
+    if not api_gateway.check_rate_limit(payment_request.merchant_id):
+        raise HTTPException(status_code=429, detail="Rate limit exceeded")
+
+    ctx = await run_in_threadpool(record_pending_payment, payment_request, db)
 
-    # Process payment asynchronously
-    background_tasks.add_task(process_payment_pipeline, payment.id, payment_request)
+    # Process payment asynchronously on the bounded pipeline workers
+    await payment_pipeline.enqueue(ctx)
 
     return PaymentResponse(
-        payment_id=payment.id,
+        payment_id=ctx.payment_id,
         status="pending",
         message="Payment initiated successfully",
         estimated_completion="2-5 seconds"
     )
 
-async def process_payment_pipeline(payment_id: str, payment_request: PaymentRequest):
+async def process_payment_pipeline(ctx: PaymentContext):
     """Background payment processing pipeline"""
-    db = next(get_db())
-    
-    try:
-        # Step 2: Risk Assessment
-        payment = db.query(Payment).filter(Payment.id == payment_id).first()
-        payment.status = PaymentStatus.RISK_CHECK
-        db.commit()
+    payment_id = ctx.payment_id
+    payment_request = ctx.request
+    payment = None
+    with SessionLocal() as db:
+        try:
+            # Step 2: Risk Assessment (no database work until it returns)
+            risk_assessment = await risk_engine.assess_risk(payment_request, payment_id)
 
-        risk_assessment = await risk_engine.assess_risk(payment_request, payment_id)
-        payment.risk_score = risk_assessment.risk_score
+            # Session work runs in the threadpool so commits never block the event loop
+            payment = await run_in_threadpool(db.get, Payment, payment_id)
+            payment.risk_score = risk_assessment.risk_score
 
-        log_transaction(db, payment_id, "risk_engine", "completed", {
-            "risk_score": risk_assessment.risk_score,
-            "risk_factors": risk_assessment.risk_factors,
-            "recommendation": risk_assessment.recommendation
-        })
-
-        # Decline high-risk payments
-        if risk_assessment.recommendation == "DECLINE":
-            payment.status = PaymentStatus.FAILED
-            payment.error_message = "Transaction declined due to high risk score"
-            db.commit()
-            log_transaction(db, payment_id, "risk_engine", "declined", {
-                "reason": "High risk score",
-                "risk_score": risk_assessment.risk_score
+            ctx.log("risk_engine", "completed", {
+                "risk_score": risk_assessment.risk_score,
+                "risk_factors": risk_assessment.risk_factors,
+                "recommendation": risk_assessment.recommendation
             })
-            return
-
-        # Step 3: Payment Orchestration
-        payment.status = PaymentStatus.PROCESSING
-        db.commit()
-
-        settlement_rail = orchestrator.select_settlement_rail(payment_request, risk_assessment.risk_score)
-        payment.settlement_rail = settlement_rail
-
-        log_transaction(db, payment_id, "orchestrator", "routing", {
-            "selected_rail": settlement_rail.value,
-            "reason": f"Amount: {payment_request.amount}, Risk: {risk_assessment.risk_score}"
-        })
-
-        # Step 4: Settlement Processing
-        settlement_result = await orchestrator.process_settlement(payment_request, settlement_rail)
-        payment.settlement_response = json.dumps(settlement_result)
 
-        if settlement_result["status"] == "completed":
-            payment.status = PaymentStatus.COMPLETED
-            payment.completed_at = datetime.utcnow()
-            log_transaction(db, payment_id, "settlement", "completed", settlement_result)
-        else:
-            payment.status = PaymentStatus.FAILED
-            payment.error_message = settlement_result.get("message", "Settlement failed")
-            log_transaction(db, payment_id, "settlement", "failed", settlement_result)
+            # Decline high-risk payments
+            if risk_assessment.recommendation == "DECLINE":
+                payment.status = PaymentStatus.FAILED
+                payment.error_message = "Transaction declined due to high risk score"
+                ctx.log("risk_engine", "declined", {
+                    "reason": "High risk score",
+                    "risk_score": risk_assessment.risk_score
+                })
+                await run_in_threadpool(commit_step, db, ctx)
+                return
+
+            # Step 3: Payment Orchestration
+            payment.status = PaymentStatus.PROCESSING
+
+            settlement_rail = orchestrator.select_settlement_rail(payment_request, risk_assessment.risk_score)
+            payment.settlement_rail = settlement_rail
+
+            ctx.log("orchestrator", "routing", {
+                "selected_rail": settlement_rail.value,
+                "reason": f"Amount: {payment_request.amount}, Risk: {risk_assessment.risk_score}"
+            })
+            # Settlement takes seconds, so commit once here for status polls to see PROCESSING
+            await run_in_threadpool(commit_step, db, ctx)
+
+            # Step 4: Settlement Processing
+            settlement_result = await orchestrator.process_settlement(payment_request, settlement_rail)
+            payment.settlement_response = settlement_result
+
+            if settlement_result["status"] == "completed":
+                payment.status = PaymentStatus.COMPLETED
+                payment.completed_at = datetime.utcnow()
+                ctx.log("settlement", "completed", settlement_result)
+            else:
+                payment.status = PaymentStatus.FAILED
+                payment.error_message = settlement_result.get("message", "Settlement failed")
+                ctx.log("settlement", "failed", settlement_result)
+
+            await run_in_threadpool(commit_step, db, ctx)
+
+        except asyncio.CancelledError:
+            # Shutdown cut the job off; record that inline (the loop is stopping anyway),
+            # but never let it swallow the cancellation
+            try:
+                fail_payment(db, ctx, payment, SHUTDOWN_ERROR)
+            except Exception as e:
+                print(f"⚠️ Could not record interrupted payment {payment_id}: {e}")
+            raise
+        except Exception as e:
+            await run_in_threadpool(fail_payment, db, ctx, payment, str(e))
+
+def commit_step(db: Session, ctx: PaymentContext):
+    """Write the buffered log rows and commit the payment's changes"""
+    write_transaction_logs(db, ctx)
+    db.commit()
 
+def fail_payment(db: Session, ctx: PaymentContext, payment: Optional[Payment], error: str):
+    """Record a payment the pipeline could not finish as FAILED"""
+    # Anything may have failed, including a flush or commit, so start a clean
+    # transaction and reuse the payment already loaded (the rollback keeps its key)
+    db.rollback()
+    if payment is None:
+        payment = db.get(Payment, ctx.payment_id)
+    payment.status = PaymentStatus.FAILED
+    payment.error_message = f"System error: {error}"
+    ctx.log("system", "error", {
+        "error": error
+    })
+    commit_step(db, ctx)
+
+def fail_dropped_payments(contexts: List[PaymentContext]):
+    """Mark payments whose pipeline job never started as FAILED"""
+    with SessionLocal() as db:
+        db.query(Payment).filter(
+            Payment.id.in_([ctx.payment_id for ctx in contexts])
+        ).update({
+            "status": PaymentStatus.FAILED,
+            "error_message": f"System error: {SHUTDOWN_ERROR}"
+        }, synchronize_session=False)
+        for ctx in contexts:
+            ctx.log("system", "error", {"error": SHUTDOWN_ERROR})
+            write_transaction_logs(db, ctx)
         db.commit()
 
-    except Exception as e:
-        payment = db.query(Payment).filter(Payment.id == payment_id).first()
-        payment.status = PaymentStatus.FAILED
-        payment.error_message = f"System error: {str(e)}"
-        db.commit()
-
-        log_transaction(db, payment_id, "system", "error", {
-            "error": str(e)
-        })
-    finally:
-        db.close()
+# Bounded pool draining queued payments, instead of one unbounded task per request
+payment_pipeline = WorkerPool(process_payment_pipeline, workers=20)
+# How long shutdown waits for queued payments before failing the rest
+PIPELINE_DRAIN_TIMEOUT_SECONDS = 10
+SHUTDOWN_ERROR = "Interrupted by shutdown"
 
 @app.get("/api/v1/payments/{payment_id}")
 async def get_payment_status(payment_id: str, db: Session = Depends(get_db)):
     """Get payment status and details"""
-    payment = db.query(Payment).filter(Payment.id == payment_id).first()
-    if not payment:
+    # Malformed ids can never match; reject them before the UUID column rejects the query
+    try:
+        payment_id = str(uuid.UUID(payment_id))
+    except ValueError:
         raise HTTPException(status_code=404, detail="Payment not found")
 
-    # Get transaction log
-    transactions = db.query(Transaction).filter(
-        Transaction.payment_id == payment_id
-    ).order_by(Transaction.timestamp).all()
-
-    settlement_details = None
-    if payment.settlement_response:
-        settlement_details = json.loads(payment.settlement_response)
+    # Load the transaction log alongside the payment instead of querying it separately
+    payment = db.query(Payment).options(
+        selectinload(Payment.transactions)
+    ).filter(Payment.id == payment_id).first()
+    if not payment:
+        raise HTTPException(status_code=404, detail="Payment not found")
 
     return {
         "payment_id": payment.id,
@@ -325,7 +417,7 @@ async def get_payment_status(payment_id: str, db: Session = Depends(get_db)):
         "currency": payment.currency,
         "risk_score": payment.risk_score,
         "settlement_rail": payment.settlement_rail.value if payment.settlement_rail else None,
-        "settlement_details": settlement_details,
+        "settlement_details": payment.settlement_response,
         "error_message": payment.error_message,
         "created_at": payment.created_at,
         "completed_at": payment.completed_at,
@@ -334,37 +426,51 @@ async def get_payment_status(payment_id: str, db: Session = Depends(get_db)):
                 "step": t.step,
                 "status": t.status,
                 "timestamp": t.timestamp,
-                "details": json.loads(t.details) if t.details else None
+                "details": t.details
             }
-            for t in transactions
+            for t in payment.transactions
         ]
     }
 
+# Dashboards poll this endpoint, so one aggregate result serves every request in the window
+ANALYTICS_CACHE_TTL_SECONDS = 5
+analytics_cache = {}  # "dashboard" -> (monotonic expiry, response body)
+
 @app.get("/api/v1/analytics/dashboard")
-async def get_analytics_dashboard(db: Session = Depends(get_db)):
+async def get_analytics_dashboard(response: Response, db: Session = Depends(get_db)):
     """Simple analytics dashboard"""
-
-    # Get payment statistics
-    total_payments = db.query(Payment).count()
-    completed_payments = db.query(Payment).filter(Payment.status == PaymentStatus.COMPLETED).count()
-    total_volume = db.query(Payment).filter(Payment.status == PaymentStatus.COMPLETED).all()
-    total_amount = sum(p.amount for p in total_volume)
-
-    # Settlement rail distribution
-    from app.models.database import SettlementRail
-    eswatini_payments = db.query(Payment).filter(
-        Payment.settlement_rail == SettlementRail.ESWATINI_SWITCH
-    ).count()
-    visa_payments = db.query(Payment).filter(
-        Payment.settlement_rail == SettlementRail.VISA_DIRECT
-    ).count()
-
-    # Risk score distribution
-    high_risk = db.query(Payment).filter(Payment.risk_score > 0.7).count()
-    medium_risk = db.query(Payment).filter(
-        Payment.risk_score > 0.3, Payment.risk_score <= 0.7
-    ).count()
-    low_risk = db.query(Payment).filter(Payment.risk_score <= 0.3).count()
+    response.headers["Cache-Control"] = f"public, max-age={ANALYTICS_CACHE_TTL_SECONDS}"
+
+    now = time.monotonic()
+    cached = analytics_cache.get("dashboard")
+    if cached is None or cached[0] <= now:
+        cached = (now + ANALYTICS_CACHE_TTL_SECONDS, compute_analytics(db))
+        analytics_cache["dashboard"] = cached
+    return cached[1]
+
+def compute_analytics(db: Session) -> dict:
+    """Payment totals plus settlement rail and risk distributions"""
+    # One round trip with conditional aggregates instead of a query per metric
+    (
+        total_payments, completed_payments, total_amount,
+        eswatini_payments, visa_payments,
+        high_risk, medium_risk, low_risk
+    ) = db.query(
+        func.count(Payment.id),
+        func.sum(case((Payment.status == PaymentStatus.COMPLETED, 1), else_=0)),
+        func.sum(case((Payment.status == PaymentStatus.COMPLETED, Payment.amount), else_=0)),
+        # Settlement rail distribution
+        func.sum(case((Payment.settlement_rail == SettlementRail.ESWATINI_SWITCH, 1), else_=0)),
+        func.sum(case((Payment.settlement_rail == SettlementRail.VISA_DIRECT, 1), else_=0)),
+        # Risk score distribution
+        func.sum(case((Payment.risk_score > 0.7, 1), else_=0)),
+        func.sum(case(((Payment.risk_score > 0.3) & (Payment.risk_score <= 0.7), 1), else_=0)),
+        func.sum(case((Payment.risk_score <= 0.3, 1), else_=0))
+    ).one()
+
+    # SUM over an empty table is NULL
+    completed_payments = completed_payments or 0
+    total_amount = total_amount or 0.0
 
     return {
         "summary": {
@@ -375,54 +481,72 @@ async def get_analytics_dashboard(db: Session = Depends(get_db)):
             "average_transaction": round(total_amount / max(completed_payments, 1), 2)
         },
         "settlement_distribution": {
-            "eswatini_switch": eswatini_payments,
-            "visa_direct": visa_payments
+            "eswatini_switch": eswatini_payments or 0,
+            "visa_direct": visa_payments or 0
         },
         "risk_distribution": {
-            "low_risk": low_risk,
-            "medium_risk": medium_risk,
-            "high_risk": high_risk
+            "low_risk": low_risk or 0,
+            "medium_risk": medium_risk or 0,
+            "high_risk": high_risk or 0
         }
     }
 
 # Mount static files
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
 
-@app.get("/", response_class=HTMLResponse)
-async def demo_frontend():
-    """Serve the demo interface"""
+def load_page(path: str, fallback: str) -> tuple:
+    """Read an HTML page once, returning its bytes and a strong ETag"""
     try:
-        with open("app/static/index.html", "r") as f:
-            return HTMLResponse(content=f.read())
+        with open(path, "rb") as f:
+            content = f.read()
     except FileNotFoundError:
-        return HTMLResponse(content="<h1>Fast Pay MVP</h1><p>Demo interface loading...</p>")
+        content = fallback.encode()
+    return content, f'"{hashlib.sha256(content).hexdigest()}"'
+
+PAGE_FILES = {
+    "index": ("app/static/index.html", "<h1>Fast Pay MVP</h1><p>Demo interface loading...</p>"),
+    "merchant": ("app/static/merchant-dashboard.html", "<h1>Merchant Dashboard</h1><p>Dashboard loading...</p>"),
+    "services": ("app/static/services-dashboard.html", "<h1>Services Dashboard</h1><p>Dashboard loading...</p>"),
+    "auth": ("app/static/auth.html", "<h1>Authentication</h1><p>Login page loading...</p>")
+}
+
+# Pages are read once, so edits to the HTML need a restart to show up
+PAGES = {}
+
+def preload_pages():
+    """Read every HTML page into the page cache"""
+    for page, (path, fallback) in PAGE_FILES.items():
+        PAGES[page] = load_page(path, fallback)
+
+def page_response(page: str, request: Request) -> Response:
+    """Serve a cached page, answering 304 when the browser's copy is current"""
+    if page not in PAGES:
+        PAGES[page] = load_page(*PAGE_FILES[page])
+    content, etag = PAGES[page]
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=60"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return HTMLResponse(content=content, headers=headers)
+
+@app.get("/", response_class=HTMLResponse)
+async def demo_frontend(request: Request):
+    """Serve the demo interface"""
+    return page_response("index", request)
 
 @app.get("/merchant", response_class=HTMLResponse)
-async def merchant_dashboard():
+async def merchant_dashboard(request: Request):
     """Serve the merchant dashboard"""
-    try:
-        with open("app/static/merchant-dashboard.html", "r") as f:
-            return HTMLResponse(content=f.read())
-    except FileNotFoundError:
-        return HTMLResponse(content="<h1>Merchant Dashboard</h1><p>Dashboard loading...</p>")
+    return page_response("merchant", request)
 
 @app.get("/services", response_class=HTMLResponse)
-async def services_dashboard():
+async def services_dashboard(request: Request):
     """Serve the national services dashboard"""
-    try:
-        with open("app/static/services-dashboard.html", "r") as f:
-            return HTMLResponse(content=f.read())
-    except FileNotFoundError:
-        return HTMLResponse(content="<h1>Services Dashboard</h1><p>Dashboard loading...</p>")
+    return page_response("services", request)
 
 @app.get("/auth", response_class=HTMLResponse)
-async def authentication_page():
+async def authentication_page(request: Request):
     """Serve the login/registration page"""
-    try:
-        with open("app/static/auth.html", "r") as f:
-            return HTMLResponse(content=f.read())
-    except FileNotFoundError:
-        return HTMLResponse(content="<h1>Authentication</h1><p>Login page loading...</p>")
+    return page_response("auth", request)
 
 if __name__ == "__main__":
     import uvicorn
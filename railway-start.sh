@@ -4,4 +4,4 @@ echo "PORT: $PORT"
 echo "Environment: Railway"
 
 # Start the application
-python -m uvicorn main:app --host 0.0.0.0 --port ${PORT:-8000} --timeout-keep-alive 30
\ No newline at end of file
+python -m uvicorn main:app --host 0.0.0.0 --port ${PORT:-8000} --timeout-keep-alive 30 --forwarded-allow-ips=*
\ No newline at end of file
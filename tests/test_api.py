@@ -1,24 +1,57 @@
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
+import asyncio
 import tempfile
 import os
 
-from main import app
-from app.models.database import Base, get_db
+import main
+from main import app, analytics_cache, process_payment_pipeline, record_pending_payment
+from datetime import datetime, timedelta
 
-# Create test database
-@pytest.fixture
-def test_db():
-    # Create temporary database
+from app.models.database import (
+    Base, enable_sqlite_wal, get_db, Payment, Transaction, PaymentStatus, SettlementRail, QRCode,
+    Merchant, MerchantStatus, BusinessType
+)
+from app.models.schemas import PaymentRequest, RiskAssessment
+from app.services.rate_limiter import RateLimitMiddleware
+from uvicorn.middleware.proxy_headers import ProxyHeadersMiddleware
+
+@pytest.fixture(scope="session")
+def test_engine():
+    # One temporary database and one create_all for the whole run
     db_fd, db_path = tempfile.mkstemp()
-    database_url = f"sqlite:///{db_path}"
+    engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False})
+    enable_sqlite_wal(engine)
+
+    # pysqlite defers BEGIN on its own; let SQLAlchemy emit it so SAVEPOINTs nest correctly
+    @event.listens_for(engine, "connect")
+    def disable_pysqlite_transactions(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def emit_begin(conn):
+        conn.exec_driver_sql("BEGIN")
+
+    Base.metadata.create_all(bind=engine)
     
-    engine = create_engine(database_url, connect_args={"check_same_thread": False})
-    TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    yield engine
     
-    Base.metadata.create_all(bind=engine)
+    # Cleanup (closing the pooled connections checkpoints and removes the WAL files)
+    engine.dispose()
+    os.close(db_fd)
+    os.unlink(db_path)
+
+@pytest.fixture
+def test_db(test_engine, monkeypatch):
+    # Each test runs inside a transaction that is rolled back afterwards; the app's
+    # commits only release savepoints within it
+    connection = test_engine.connect()
+    transaction = connection.begin()
+    TestingSessionLocal = sessionmaker(
+        autocommit=False, autoflush=False, bind=connection, join_transaction_mode="create_savepoint"
+    )
     
     def override_get_db():
         db = TestingSessionLocal()
@@ -28,12 +61,16 @@ def test_db():
             db.close()
     
     app.dependency_overrides[get_db] = override_get_db
+    # The payment pipeline opens its own sessions rather than going through get_db
+    monkeypatch.setattr(main, "SessionLocal", TestingSessionLocal)
+    # Cached aggregates would describe an earlier test's (rolled back) data
+    analytics_cache.clear()
     
     yield TestingSessionLocal
     
-    # Cleanup
-    os.close(db_fd)
-    os.unlink(db_path)
+    app.dependency_overrides.pop(get_db, None)
+    transaction.rollback()
+    connection.close()
 
 @pytest.fixture
 def client(test_db):
@@ -51,7 +88,7 @@ def test_create_payment(client):
     }
     
     response = client.post("/api/v1/payments", json=payment_data)
-    assert response.status_code == 200
+    assert response.status_code == 202
     
     data = response.json()
     assert "payment_id" in data
@@ -95,18 +132,245 @@ def test_get_payment_status(client):
     assert data["amount"] == 500.0
     assert data["currency"] == "SZL"
 
+def test_payment_status_unknown_id(client):
+    """Unknown or malformed payment ids return 404"""
+    assert client.get("/api/v1/payments/00000000-0000-0000-0000-000000000000").status_code == 404
+    assert client.get("/api/v1/payments/not-a-uuid").status_code == 404
+
+def test_payment_status_transaction_log(client, test_db):
+    """Test payment status includes its transaction log in time order"""
+    db = test_db()
+    payment = Payment(merchant_id="MERCH_001", customer_id="CUST_001", amount=250.0,
+                      status=PaymentStatus.PROCESSING)
+    db.add(payment)
+    db.flush()
+    started = datetime.utcnow()
+    db.add_all([
+        Transaction(payment_id=payment.id, step="risk_engine", status="completed",
+                    details={"risk_score": 0.2}, timestamp=started + timedelta(seconds=1)),
+        Transaction(payment_id=payment.id, step="api_gateway", status="success",
+                    timestamp=started)
+    ])
+    db.commit()
+    payment_id = payment.id
+    db.close()
+
+    data = client.get(f"/api/v1/payments/{payment_id}").json()
+    assert [t["step"] for t in data["transaction_log"]] == ["api_gateway", "risk_engine"]
+    assert data["transaction_log"][1]["details"] == {"risk_score": 0.2}
+
+def run_pipeline(test_db, monkeypatch, recommendation="APPROVE", settle=None):
+    """Record a pending payment, run it through the pipeline and return the stored payment"""
+    async def assess_risk(payment_data, payment_id):
+        return RiskAssessment(payment_id=payment_id, risk_score=0.1, risk_factors=[],
+                              recommendation=recommendation)
+
+    async def settle_completed(payment_data, settlement_rail):
+        return {"status": "completed", "rail": settlement_rail.value}
+
+    monkeypatch.setattr(main.risk_engine, "assess_risk", assess_risk)
+    monkeypatch.setattr(main.orchestrator, "process_settlement", settle or settle_completed)
+
+    db = test_db()
+    ctx = record_pending_payment(PaymentRequest(
+        merchant_id="MERCH_001", customer_id="CUST_001", amount=100.0, payment_method="qr_code"
+    ), db)
+    db.close()
+
+    asyncio.run(process_payment_pipeline(ctx))
+
+    db = test_db()
+    payment = db.get(Payment, ctx.payment_id)
+    steps = [(t.step, t.status) for t in payment.transactions]
+    return payment, steps
+
+def test_pipeline_completes_payment(test_db, monkeypatch):
+    """An approved payment is routed, settled and logged step by step"""
+    payment, steps = run_pipeline(test_db, monkeypatch)
+
+    assert payment.status == PaymentStatus.COMPLETED
+    assert payment.settlement_rail == SettlementRail.ESWATINI_SWITCH
+    assert payment.settlement_response == {"status": "completed", "rail": "eswatini_switch"}
+    assert payment.completed_at is not None
+    assert steps == [("api_gateway", "success"), ("risk_engine", "completed"),
+                     ("orchestrator", "routing"), ("settlement", "completed")]
+
+def test_pipeline_declines_high_risk_payment(test_db, monkeypatch):
+    """A DECLINE recommendation fails the payment before it reaches settlement"""
+    async def settle(payment_data, settlement_rail):
+        raise AssertionError("declined payments must not be settled")
+
+    payment, steps = run_pipeline(test_db, monkeypatch, recommendation="DECLINE", settle=settle)
+
+    assert payment.status == PaymentStatus.FAILED
+    assert payment.error_message == "Transaction declined due to high risk score"
+    assert payment.settlement_rail is None
+    assert steps == [("api_gateway", "success"), ("risk_engine", "completed"),
+                     ("risk_engine", "declined")]
+
+def test_pipeline_records_settlement_error(test_db, monkeypatch):
+    """A settlement that raises rolls back and leaves the payment FAILED with an error log"""
+    async def settle(payment_data, settlement_rail):
+        raise RuntimeError("rail down")
+
+    payment, steps = run_pipeline(test_db, monkeypatch, settle=settle)
+
+    assert payment.status == PaymentStatus.FAILED
+    assert payment.error_message == "System error: rail down"
+    # The routing step was committed before settlement started, so the rollback keeps it
+    assert payment.settlement_rail == SettlementRail.ESWATINI_SWITCH
+    assert steps == [("api_gateway", "success"), ("risk_engine", "completed"),
+                     ("orchestrator", "routing"), ("system", "error")]
+
 def test_analytics_dashboard(client):
     """Test analytics endpoint"""
     response = client.get("/api/v1/analytics/dashboard")
     assert response.status_code == 200
     
+    assert response.headers["cache-control"] == "public, max-age=5"
+    
     data = response.json()
     assert "summary" in data
     assert "settlement_distribution" in data
     assert "risk_distribution" in data
 
+def test_analytics_dashboard_aggregates(client, test_db):
+    """Test analytics totals and distributions over seeded payments"""
+    db = test_db()
+    db.add_all([
+        Payment(merchant_id="MERCH_001", customer_id="CUST_001", amount=100.0,
+                status=PaymentStatus.COMPLETED, risk_score=0.1,
+                settlement_rail=SettlementRail.ESWATINI_SWITCH),
+        Payment(merchant_id="MERCH_001", customer_id="CUST_002", amount=300.0,
+                status=PaymentStatus.COMPLETED, risk_score=0.5,
+                settlement_rail=SettlementRail.VISA_DIRECT),
+        Payment(merchant_id="MERCH_001", customer_id="CUST_003", amount=50.0,
+                status=PaymentStatus.FAILED, risk_score=0.9),
+        Payment(merchant_id="MERCH_001", customer_id="CUST_004", amount=75.0,
+                status=PaymentStatus.PENDING)
+    ])
+    db.commit()
+    db.close()
+
+    data = client.get("/api/v1/analytics/dashboard").json()
+    assert data["summary"] == {
+        "total_payments": 4,
+        "completed_payments": 2,
+        "success_rate": 50.0,
+        "total_volume": 400.0,
+        "average_transaction": 200.0
+    }
+    assert data["settlement_distribution"] == {"eswatini_switch": 1, "visa_direct": 1}
+    assert data["risk_distribution"] == {"low_risk": 1, "medium_risk": 1, "high_risk": 1}
+
+    # Within the cache window new payments don't change the served totals
+    db = test_db()
+    db.add(Payment(merchant_id="MERCH_001", customer_id="CUST_005", amount=10.0))
+    db.commit()
+    db.close()
+    assert client.get("/api/v1/analytics/dashboard").json()["summary"]["total_payments"] == 4
+
 def test_demo_frontend(client):
     """Test frontend endpoint"""
     response = client.get("/")
     assert response.status_code == 200
-    assert "Eswatini Payment System Demo" in response.text
\ No newline at end of file
+    assert "Eswatini Payment System Demo" in response.text
+
+def test_transport_routes(client):
+    """Test pre-serialized transport route listing"""
+    response = client.get("/api/v1/services/transport/routes")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+
+    data = response.json()
+    assert data["status"] == "success"
+    assert data["data"][0]["route_id"] == "R001"
+
+def test_payment_creation_rate_limited_per_forwarded_client(client, monkeypatch):
+    """Bursts from one forwarded client get 429 before reaching the handler"""
+    # Trust the test client as the fronting proxy and rebuild the app's middleware stack
+    proxy = next(m for m in app.user_middleware if m.cls is ProxyHeadersMiddleware)
+    limiter = next(m for m in app.user_middleware if m.cls is RateLimitMiddleware).options["limiter"]
+    monkeypatch.setitem(proxy.options, "trusted_hosts", "testclient")
+    monkeypatch.setattr(app, "middleware_stack", None)
+    # Slow the refill so the burst cannot earn a token back mid-test
+    monkeypatch.setattr(limiter, "period", 60.0)
+
+    def post(path, client_ip):
+        return client.post(path, json={}, headers={"X-Forwarded-For": client_ip}).status_code
+
+    # Empty bodies pass the limiter and are rejected by validation (422)
+    codes = [post("/api/v1/payments", "203.0.113.7") for _ in range(limiter.rate + 1)]
+    assert codes == [422] * limiter.rate + [429]
+    assert post("/api/v1/merchants/MERCH_001/qr-codes", "203.0.113.7") == 429
+    assert post("/api/v1/payments", "203.0.113.8") == 422
+    assert client.get("/api/v1/payments/not-a-uuid", headers={"X-Forwarded-For": "203.0.113.7"}).status_code == 404
+
+def test_html_pages_revalidate_with_etag(client):
+    """Pages carry an ETag and answer a matching If-None-Match with 304"""
+    response = client.get("/auth")
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+
+    revalidated = client.get("/auth", headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+
+def test_startup_reports_page_preload_failure(monkeypatch, capsys):
+    """A failed page preload is logged instead of silently discarded"""
+    def unreadable_pages():
+        raise PermissionError("app/static/index.html")
+
+    monkeypatch.setattr(main, "init_db", lambda: None)
+    monkeypatch.setattr(main, "preload_pages", unreadable_pages)
+    asyncio.run(main.startup_event())
+
+    output = capsys.readouterr().out
+    assert "Database initialized successfully" in output
+    assert "Page preload warning: app/static/index.html" in output
+
+def test_qr_code_image_rendered_locally(client, test_db):
+    """QR code PNGs are served by the app itself"""
+    db = test_db()
+    db.add(QRCode(merchant_id="MERCH_001", qr_code_id="QR_PNGTEST", amount=50.0, description="Coffee"))
+    db.commit()
+    db.close()
+
+    response = client.get("/qr/QR_PNGTEST.png")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/png"
+    assert response.content.startswith(b"\x89PNG")
+    assert client.get("/qr/QR_MISSING.png").status_code == 404
+
+def test_generated_qr_code_links_to_its_image(client, test_db):
+    """Generated QR codes carry an absolute URL to the app's own PNG route"""
+    db = test_db()
+    db.add(Merchant(merchant_id="MERCH_QRGEN", business_name="Corner Shop", business_type=BusinessType.RETAIL,
+                    owner_name="Owner", phone="+26876000000", email="shop@example.com", address="Mbabane",
+                    id_number="ID123", api_key="key_qrgen", api_secret="secret", status=MerchantStatus.APPROVED))
+    db.commit()
+    db.close()
+
+    data = client.post("/api/v1/merchants/MERCH_QRGEN/qr-codes", json={"amount": 25.0}).json()
+    assert data["qr_code_url"] == f"http://testserver/qr/{data['qr_code_id']}.png"
+    assert client.get(data["qr_code_url"]).content.startswith(b"\x89PNG")
+
+def test_merchant_qr_code_list(client, test_db):
+    """QR code listing returns the active codes with their usage fields"""
+    db = test_db()
+    db.add_all([
+        QRCode(merchant_id="MERCH_LIST", qr_code_id="QR_LIST1", amount=20.0, max_usage=1),
+        QRCode(merchant_id="MERCH_LIST", qr_code_id="QR_LIST2", is_active=False)
+    ])
+    db.commit()
+    db.close()
+
+    response = client.get("/api/v1/merchants/MERCH_LIST/qr-codes")
+    assert response.status_code == 200
+    items = response.json()
+    assert len(items) == 1
+    assert isinstance(datetime.fromisoformat(items[0].pop("created_at")), datetime)
+    assert items == [{
+        "qr_code_id": "QR_LIST1", "amount": 20.0, "description": None, "is_dynamic": False,
+        "expires_at": None, "usage_count": 0.0, "max_usage": 1.0, "is_active": True
+    }]
@@ -0,0 +1,190 @@
+import asyncio
+from itertools import count
+
+from app.models.schemas import PaymentRequest
+from app.services.api_gateway import APIGateway
+from app.services.lru_dict import LRUDict
+from app.services.prefill_pool import PrefillPool
+from app.services.risk_engine import RiskEngine
+from app.services.visa_card_service import VisaCardService
+from app.services.worker_pool import WorkerPool
+from app.services.service_integration import (
+    UtilityServiceIntegration, GovernmentServiceIntegration
+)
+
+def test_utility_balance_cached_per_account():
+    """Repeat balance reads are served from the TTL cache"""
+    first = asyncio.run(UtilityServiceIntegration().get_customer_balance("EWSC", "ACC_CACHE_1"))
+    first["current_balance"] = -1
+    second = asyncio.run(UtilityServiceIntegration().get_customer_balance("EWSC", "ACC_CACHE_1"))
+    other = asyncio.run(UtilityServiceIntegration().get_customer_balance("EWSC", "ACC_CACHE_2"))
+
+    assert ("ACC_CACHE_1",) in UtilityServiceIntegration._get_water_balance.cache
+    # Each caller gets its own copy, so one caller's edits don't leak into the cache
+    assert second["current_balance"] != -1
+    assert other["account_number"] == "ACC_CACHE_2"
+
+def test_utility_payment_evicts_cached_balance():
+    """Paying a bill drops the account's cached balance"""
+    integration = UtilityServiceIntegration()
+    asyncio.run(integration.get_customer_balance("EWSC", "ACC_CACHE_PAID"))
+    asyncio.run(integration.process_utility_payment({
+        "provider_code": "EWSC", "account_number": "ACC_CACHE_PAID", "amount": 10.0
+    }))
+
+    assert ("ACC_CACHE_PAID",) not in UtilityServiceIntegration._get_water_balance.cache
+
+def test_government_liability_cache_separates_services():
+    """Tax and fine lookups for the same identifier are cached independently"""
+    integration = GovernmentServiceIntegration()
+    tax = asyncio.run(integration.get_tax_liability("ID_CACHE_1"))
+    fines = asyncio.run(integration.get_police_fines("ID_CACHE_1"))
+
+    assert tax["taxpayer_id"] == "ID_CACHE_1"
+    assert isinstance(fines, list)
+    assert ("ID_CACHE_1",) in GovernmentServiceIntegration.get_tax_liability.cache
+    assert ("ID_CACHE_1",) in GovernmentServiceIntegration.get_police_fines.cache
+
+    asyncio.run(integration.process_government_payment({
+        "service_type": "fine_payment", "identifier": "ID_CACHE_1", "fine_id": "FINE_1", "amount": 100.0
+    }))
+    assert ("ID_CACHE_1",) not in GovernmentServiceIntegration.get_police_fines.cache
+    assert ("ID_CACHE_1",) in GovernmentServiceIntegration.get_tax_liability.cache
+
+def test_worker_pool_stop_drains_queued_jobs():
+    """Stopping waits for queued jobs to finish before cancelling the workers"""
+    done = []
+
+    async def job(n):
+        await asyncio.sleep(0.01)
+        done.append(n)
+
+    async def run():
+        pool = WorkerPool(job, workers=1)
+        for n in range(3):
+            await pool.enqueue(n)
+        return await pool.stop(timeout=5)
+
+    assert asyncio.run(run()) == []
+    assert done == [0, 1, 2]
+
+def test_worker_pool_stop_returns_jobs_it_could_not_run():
+    """Jobs still queued after the drain timeout are handed back to the caller"""
+    async def job(n):
+        await asyncio.sleep(10)
+
+    async def run():
+        pool = WorkerPool(job, workers=1)
+        for n in range(3):
+            await pool.enqueue(n)
+        return await pool.stop(timeout=0.05)
+
+    assert asyncio.run(run()) == [(1,), (2,)]
+
+def test_merchant_profiles_evict_least_recently_used():
+    """Risk engine merchant profiles stay bounded"""
+    engine = RiskEngine(max_merchant_profiles=2)
+    engine.merchant_profiles["MERCH_A"] = {}
+    engine.merchant_profiles["MERCH_B"] = {}
+    engine.merchant_profiles["MERCH_A"]
+    engine.merchant_profiles["MERCH_C"] = {}
+
+    assert list(engine.merchant_profiles) == ["MERCH_A", "MERCH_C"]
+
+def test_lru_dict_get_refreshes_recency():
+    """Reads through get() keep a key from being evicted"""
+    cache = LRUDict(2)
+    cache["a"] = 1
+    cache["b"] = 2
+    assert cache.get("a") == 1
+    assert cache.get("missing", 0) == 0
+    cache["c"] = 3
+
+    assert list(cache) == ["a", "c"]
+
+def test_assess_risk_batch_scores_each_payment():
+    """Batch risk assessment returns one result per payment, in order"""
+    engine = RiskEngine()
+    payments = [
+        PaymentRequest(merchant_id="MERCH_001", customer_id="CUST_001", amount=amount, payment_method="qr_code")
+        for amount in (100.0, 9000.0)
+    ]
+
+    results = asyncio.run(engine.assess_risk_batch(payments, ["PAY_1", "PAY_2"]))
+
+    assert [r.payment_id for r in results] == ["PAY_1", "PAY_2"]
+    assert any(f.startswith("High amount") for f in results[1].risk_factors)
+    assert not any(f.startswith("High amount") for f in results[0].risk_factors)
+
+def test_card_data_encryption_round_trip():
+    """Card data encrypted by VisaCardService decrypts back to the original"""
+    service = VisaCardService()
+    token = service.encrypt_sensitive_data("4532015112830366")
+
+    assert token != "4532015112830366"
+    assert service.decrypt_sensitive_data(token) == "4532015112830366"
+
+def test_luhn_check_digit_matches_known_card():
+    """Luhn check digit for a known valid Visa test number"""
+    assert VisaCardService()._calculate_luhn_check_digit("453201511283036") == 6
+
+def test_card_encryption_shared_across_instances():
+    """Data encrypted by one VisaCardService decrypts with another"""
+    token = VisaCardService().encrypt_sensitive_data("123")
+    assert VisaCardService().decrypt_sensitive_data(token) == "123"
+
+def test_prefill_pool_serves_prebuilt_items_then_refills():
+    """A filled pool serves its stock in order, then keeps serving fresh items"""
+    counter = count()
+    pool = PrefillPool(lambda: next(counter), maxsize=4)
+    pool.fill()
+
+    assert [pool.get() for _ in range(4)] == [0, 1, 2, 3]
+    # Whether these come from the background refill or are built inline, none repeat
+    later = [pool.get() for _ in range(4)]
+    assert len(set(later)) == 4 and min(later) >= 4
+
+def test_card_material_decrypts_to_issued_number():
+    """Pre-built card material holds only ciphertexts of a valid PAN and CVV"""
+    service = VisaCardService()
+    encrypted_number, encrypted_cvv, masked = service.card_material.get()
+    card_number = service.decrypt_sensitive_data(encrypted_number)
+    cvv = service.decrypt_sensitive_data(encrypted_cvv)
+
+    assert len(card_number) == 16 and card_number.startswith("4532")
+    assert service._calculate_luhn_check_digit(card_number[:-1]) == int(card_number[-1])
+    assert len(cvv) == 3 and cvv.isdigit()
+    assert masked == f"{card_number[:4]}****{card_number[-4:]}"
+
+def test_rate_limit_token_bucket():
+    """Merchants get a burst up to the per-minute limit, tracked separately"""
+    gateway = APIGateway(rate_limit_per_minute=3)
+    assert [gateway.check_rate_limit("MERCH_RL") for _ in range(4)] == [True, True, True, False]
+    assert gateway.check_rate_limit("MERCH_OTHER")
+
+def test_generated_card_number_is_valid_visa_pan():
+    """Generated PANs are 16 digits with the test prefix and a valid Luhn check digit"""
+    service = VisaCardService()
+    card_number = service.generate_card_number()
+
+    assert len(card_number) == 16 and card_number.startswith("4532")
+    assert service._calculate_luhn_check_digit(card_number[:-1]) == int(card_number[-1])
+
+def test_merchant_authentication_cached_until_invalidated():
+    """Repeat authentications reuse the cached decision instead of querying"""
+    gateway = APIGateway()
+    lookups = []
+
+    def lookup(merchant_id, db):
+        lookups.append(merchant_id)
+        return None
+
+    gateway.merchant_service.authenticate_merchant_id = lookup
+    db = object()
+    assert gateway.authenticate_request("MERCH_CACHED", db)
+    assert gateway.authenticate_request("MERCH_CACHED", db)
+    assert lookups == ["MERCH_CACHED"]
+
+    gateway.invalidate_merchant("MERCH_CACHED")
+    assert gateway.authenticate_request("MERCH_CACHED", db)
+    assert lookups == ["MERCH_CACHED", "MERCH_CACHED"]